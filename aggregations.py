@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+import timeline
+
+# Counts the Dashboard Charts Read
+ONE_WAY = [
+    "Gender", "Country", "Occupation", "self_employed", "family_history", "treatment",
+    "Days_Indoors", "Growing_Stress", "Changes_Habits", "Mental_Health_History", "Mood_Swings",
+    "Coping_Struggles", "Work_Interest", "Social_Weakness", "mental_health_interview", "care_options",
+]
+TWO_WAY = [
+    ("Days_Indoors", "Coping_Struggles"),
+    ("Country", "Coping_Struggles"),
+    ("Changes_Habits", "Coping_Struggles"),
+    ("Gender", "Mood_Swings"),
+    ("family_history", "Mood_Swings"),
+    ("Occupation", "Growing_Stress"),
+    ("Country", "care_options"),
+    ("Gender", "treatment"),
+    ("treatment", "Mood_Swings"),
+    ("treatment", "family_history"),
+]
+
+
+def column_codes(series):
+    """Integer codes (-1 for missing) and their labels for a column."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series, sort=True)
+
+
+def count_table(cols, labels, counts):
+    """Turn a dense count array into the (cols..., Total_Responses) frame the charts use."""
+    positions = np.nonzero(counts)
+    data = {col: labels[col].take(pos) for col, pos in zip(cols, positions)}
+    data["Total_Responses"] = counts[positions]
+    return pd.DataFrame(data)
+
+
+def counted_columns(one_way=ONE_WAY, two_way=TWO_WAY):
+    return list(dict.fromkeys([*one_way, *(col for pair in two_way for col in pair)]))
+
+
+def _bincount(values, weights, keep, minlength):
+    if weights is None:
+        return np.bincount(values, minlength=minlength)
+    # Weighted counts are estimates (see sampling.Sample), rounded to whole responses
+    return np.rint(np.bincount(values, weights=weights[keep], minlength=minlength)).astype(np.int64)
+
+
+def count_codes(codes, labels, one_way=ONE_WAY, two_way=TWO_WAY, weights=None):
+    """Dense one-way and two-way counts of per-row codes (-1 for missing) against labels.
+
+    With weights, each row counts as its weight instead of as one.
+    """
+    counts = {}
+    for col in one_way:
+        col_codes = codes[col]
+        present = col_codes >= 0
+        counts[(col,)] = _bincount(col_codes[present], weights, present, len(labels[col]))
+    for a, b in two_way:
+        size_b = len(labels[b])
+        both = (codes[a] >= 0) & (codes[b] >= 0)
+        combined = codes[a][both].astype(np.int64) * size_b + codes[b][both]
+        pair_counts = _bincount(combined, weights, both, len(labels[a]) * size_b)
+        counts[(a, b)] = pair_counts.reshape(len(labels[a]), size_b)
+    return counts
+
+
+class Aggregates:
+    """Every one-way and two-way count for a selection.
+
+    counts(col) and counts(col_a, col_b) return the same frames as
+    groupby(cols, observed=True).size().reset_index(name="Total_Responses").
+    Time series come from the responses per day (days since the epoch, counts).
+    """
+
+    def __init__(self, size, labels, counts, daily):
+        self.size = size
+        self.labels = labels
+        self._counts = counts
+        self.daily = daily
+
+    @classmethod
+    def from_frame(cls, df, one_way=ONE_WAY, two_way=TWO_WAY, weights=None):
+        """Count a row-level selection, reading each column's codes once and using np.bincount.
+
+        weights (one per row) turn the counts into estimates, e.g. for a sample.
+        """
+        codes, labels = {}, {}
+        for col in counted_columns(one_way, two_way):
+            codes[col], labels[col] = column_codes(df[col])
+
+        days, valid = timeline.day_numbers(df["Timestamp"])
+        days = days[valid]
+        first_day = days.min() if len(days) else 0
+        per_day = _bincount(days - first_day, weights, valid, 0)
+        active = np.flatnonzero(per_day)
+        size = len(df) if weights is None else int(np.rint(weights.sum()))
+        counts = count_codes(codes, labels, one_way, two_way, weights)
+        return cls(size, labels, counts, (active + first_day, per_day[active]))
+
+    def counts(self, *cols):
+        return count_table(cols, self.labels, self._counts[cols])
+
+    def table(self, col_a, col_b):
+        """Dense counts of a counted pair, rows following labels[col_a] and columns labels[col_b]."""
+        return self._counts[(col_a, col_b)]
+
+    def over_time(self, unit="Y"):
+        """Responses per calendar year ("Y"), month ("M") or day ("D")."""
+        return timeline.bucket(*self.daily, unit)
+
+    def nunique(self, col):
+        return int(np.count_nonzero(self._counts[(col,)]))
@@ -0,0 +1,215 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+import dataset
+import filters
+import profiling
+import sampling
+import timeline
+from aggregations import ONE_WAY, TWO_WAY, Aggregates, count_codes, counted_columns
+
+# Query Backends (where filtered counts come from):
+# "cube" sums the pre-aggregated count cube, "memory" scans the rows held in memory and
+# "parquet" scans the on-disk Parquet copy of the CSV without ever loading the rows
+BACKENDS = ["cube", "memory", "parquet"]
+
+# Rows per record batch when scanning Parquet, which bounds the memory a query needs
+SCAN_BATCH_ROWS = 256 * 1024
+
+
+class SnapshotQueries:
+    """Queries over an in-memory store.Snapshot, answered by its count cube or by its rows."""
+
+    def __init__(self, snapshot, use_cube=True):
+        self.snapshot = snapshot
+        self.use_cube = use_cube
+        self.version = snapshot.version
+        self.overall = snapshot.overall
+
+    def values(self, col):
+        return self.snapshot.filter_index.values(col)
+
+    @property
+    def min_date(self):
+        return self.snapshot.filter_index.min_date
+
+    @property
+    def max_date(self):
+        return self.snapshot.filter_index.max_date
+
+    def canonical(self, selections):
+        return self.snapshot.filter_index.canonical(selections)
+
+    @property
+    def rows(self):
+        return len(self.snapshot.df)
+
+    def sample(self, size, seed=0):
+        """A stratified sample.Sample of about size rows."""
+        return sampling.Sample.from_frame(self.snapshot.df, size, seed)
+
+    def aggregates(self, selections, start_date, end_date):
+        if self.use_cube:
+            with profiling.stage("aggregate"):
+                return self.snapshot.cube.aggregates(selections, start_date, end_date)
+        return self._count_rows(selections, start_date, end_date)
+
+    def _count_rows(self, selections, start_date, end_date, one_way=ONE_WAY, two_way=TWO_WAY):
+        with profiling.stage("filter"):
+            df = self.snapshot.df
+            df_selection = df.iloc[self.snapshot.filter_index.select(selections, start_date, end_date)]
+        with profiling.stage("aggregate"):
+            return Aggregates.from_frame(df_selection, one_way, two_way)
+
+    def pair_counts(self, pairs, selections, start_date, end_date):
+        """Aggregates counting only the given column pairs, always from the rows."""
+        return self._count_rows(selections, start_date, end_date, [], pairs)
+
+
+class ParquetQueries:
+    """Queries answered by scanning the Parquet dataset ingest_parquet() wrote, for datasets larger than memory.
+
+    A date range skips the months outside it, and row groups whose Timestamp
+    statistics fall outside it. The other filters are evaluated on every scanned
+    row, one record batch at a time, and only the counts of matching rows are kept.
+    """
+
+    def __init__(self, path, meta, one_way=ONE_WAY, two_way=TWO_WAY):
+        self.path = path
+        self.version = meta["sha256"]
+        self.rows = meta["rows"]
+        self.labels = {col: pd.Index(values) for col, values in meta["labels"].items()}
+        self.min_date = datetime.date.fromisoformat(meta["start_date"])
+        self.max_date = datetime.date.fromisoformat(meta["end_date"])
+        self.one_way = list(one_way)
+        self.two_way = [tuple(pair) for pair in two_way]
+        self.columns = counted_columns(self.one_way, self.two_way)
+        self.dataset = ds.dataset(path, format=ds.ParquetFileFormat(
+            read_options={"dictionary_columns": dataset.CATEGORICAL_COLUMNS},
+        ), partitioning=dataset.parquet_partitioning())
+        self.overall = None
+        self.overall = self.aggregates()
+
+    def values(self, col):
+        return list(self.labels[col])
+
+    def canonical(self, selections):
+        return filters.canonical({col: self.labels[col] for col in selections}, selections)
+
+    def _filter(self, selections, start_date, end_date):
+        """Scan filter for a filter state, or None when the state matches every row."""
+        conditions = [pc.field(col).isin(list(selected)) for col, selected in (selections or {}).items() if len(selected)]
+        # A range covering every row needs no condition
+        # The month conditions let the scan skip whole partitions
+        if start_date is not None and start_date > self.min_date:
+            conditions.append(pc.field(dataset.PARTITION_COLUMN) >= dataset.parquet_period(start_date))
+            conditions.append(pc.field("Timestamp") >= pd.Timestamp(start_date))
+        if end_date is not None and end_date < self.max_date:
+            conditions.append(pc.field(dataset.PARTITION_COLUMN) <= dataset.parquet_period(end_date))
+            conditions.append(pc.field("Timestamp") < pd.Timestamp(end_date + datetime.timedelta(days=1)))
+        if not conditions:
+            return None
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression = expression & condition
+        return expression
+
+    def _codes(self, array, col):
+        """Codes of a scanned column against this dataset's labels (-1 for missing)."""
+        if pa.types.is_dictionary(array.type):
+            remap = np.append(self.labels[col].get_indexer(array.dictionary.to_pandas()), -1)
+            return remap[pc.fill_null(array.indices, -1).to_numpy()]
+        return self.labels[col].get_indexer(array.to_pandas())
+
+    def _scan(self, columns, expression=None):
+        return self.dataset.scanner(columns=columns, filter=expression, batch_size=SCAN_BATCH_ROWS).to_batches()
+
+    def sample(self, size, seed=0):
+        """A stratified sampling.Sample of about size rows, in two scans: one counting the
+        strata and one keeping rows.
+        """
+        strata = filters.FILTER_COLUMNS
+        stratum_sizes = np.zeros(np.prod([len(self.labels[col]) + 1 for col in strata]), dtype=np.int64)
+        with profiling.stage("scan"):
+            for batch in self._scan(strata):
+                keys = sampling.stratum_keys({col: self._codes(batch.column(col), col) for col in strata}, self.labels)
+                stratum_sizes += np.bincount(keys, minlength=len(stratum_sizes))
+            probabilities = sampling.inclusion_probabilities(stratum_sizes, size)
+
+            rng = np.random.default_rng(seed)
+            kept = {col: [] for col in self.columns + ["Timestamp"]}
+            kept_probabilities = []
+            for batch in self._scan(self.columns + ["Timestamp"]):
+                codes = {col: self._codes(batch.column(col), col) for col in self.columns}
+                row_probabilities = probabilities[sampling.stratum_keys(codes, self.labels)]
+                keep = rng.random(batch.num_rows) < row_probabilities
+                for col in self.columns:
+                    kept[col].append(codes[col][keep])
+                kept["Timestamp"].append(batch.column("Timestamp").to_numpy(zero_copy_only=False)[keep])
+                kept_probabilities.append(row_probabilities[keep])
+
+        columns = {
+            col: pd.Categorical.from_codes(np.concatenate(kept[col]), self.labels[col])
+            for col in self.columns
+        }
+        columns["Timestamp"] = np.concatenate(kept["Timestamp"]).astype("datetime64[ns]")
+        return sampling.Sample.from_columns(columns, np.concatenate(kept_probabilities), self.rows)
+
+    def aggregates(self, selections=None, start_date=None, end_date=None):
+        """Aggregates for a filter state (same arguments as filters.FilterIndex.select)."""
+        expression = self._filter(selections, start_date, end_date)
+        if expression is None and self.overall is not None:
+            return self.overall
+        return self._count(expression, self.one_way, self.two_way)
+
+    def pair_counts(self, pairs, selections, start_date, end_date):
+        """Aggregates counting only the given column pairs."""
+        return self._count(self._filter(selections, start_date, end_date), [], [tuple(pair) for pair in pairs])
+
+    def _count(self, expression, one_way, two_way):
+        columns = counted_columns(one_way, two_way)
+        # Rows without a timestamp are never counted, as in the filter index and count cube
+        timestamped = pc.field("Timestamp").is_valid()
+        with profiling.stage("scan"):
+            batches = self._scan(columns + ["Timestamp"],
+                                 timestamped if expression is None else expression & timestamped)
+            first_day = timeline.day_number(self.min_date)
+            per_day = np.zeros(timeline.day_number(self.max_date) - first_day + 1, dtype=np.int64)
+            counts, size = None, 0
+            for batch in batches:
+                if not batch.num_rows:
+                    continue
+                codes = {col: self._codes(batch.column(col), col) for col in columns}
+                batch_counts = count_codes(codes, self.labels, one_way, two_way)
+                if counts is None:
+                    counts = batch_counts
+                else:
+                    for spec, values in batch_counts.items():
+                        counts[spec] += values
+                days, _ = timeline.day_numbers(batch.column("Timestamp").to_numpy(zero_copy_only=False))
+                per_day += np.bincount(days - first_day, minlength=len(per_day))
+                size += batch.num_rows
+
+        if counts is None:
+            empty = {col: np.array([], dtype=np.int64) for col in columns}
+            counts = count_codes(empty, self.labels, one_way, two_way)
+        active = np.flatnonzero(per_day)
+        return Aggregates(size, self.labels, counts, (active + first_day, per_day[active]))
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown query backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+
+def queries(snapshot, backend):
+    """The query interface app.py uses, for whatever the configured store holds."""
+    check_backend(backend)
+    if isinstance(snapshot, ParquetQueries):
+        return snapshot
+    return SnapshotQueries(snapshot, use_cube=backend == "cube")
@@ -0,0 +1,63 @@
+"""Synthetic survey data for the benchmarks.
+
+Writes a CSV with the columns of the real dataset. Every answer column is drawn
+independently with the real dataset's answer frequencies, and timestamps are
+spread uniformly over its time range, in the same "8/27/2014 11:29" format.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import timeline  # noqa: E402
+
+# Rows generated and written per step, so large datasets never sit in memory at once
+CHUNK_ROWS = 1_000_000
+
+
+def answer_frequencies(source):
+    """Answers (None for a blank) and their shares per column, plus the time range."""
+    df = pd.read_csv(source, dtype=str, keep_default_na=False)
+    frequencies = {}
+    for col in df.columns.drop("Timestamp"):
+        shares = df[col].value_counts(normalize=True)
+        frequencies[col] = ([value or None for value in shares.index], shares.to_numpy())
+    timestamps = timeline.parse(df["Timestamp"])
+    return frequencies, (timestamps.min(), timestamps.max())
+
+
+def _format_timestamps(timestamps):
+    dt = timestamps.dt
+    return (dt.month.astype(str) + "/" + dt.day.astype(str) + "/" + dt.year.astype(str) + " "
+            + dt.hour.astype(str) + ":" + dt.minute.astype(str).str.zfill(2))
+
+
+def generate(rows, path, source=os.path.join(ROOT, "mental_health_dataset.csv"), seed=0):
+    frequencies, (start, end) = answer_frequencies(source)
+    rng = np.random.default_rng(seed)
+    minutes = int((end - start) / pd.Timedelta(minutes=1)) + 1
+
+    tmp_path = path + ".tmp"
+    for first in range(0, rows, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, rows - first)
+        offsets = pd.to_timedelta(rng.integers(0, minutes, size), unit="min")
+        chunk = {"Timestamp": _format_timestamps(pd.Series(start.floor("min") + offsets))}
+        for col, (values, shares) in frequencies.items():
+            chunk[col] = np.array(values, dtype=object)[rng.choice(len(values), size, p=shares)]
+        pd.DataFrame(chunk).to_csv(tmp_path, mode="w" if first == 0 else "a", header=first == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("rows", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.rows, args.path, seed=args.seed)
@@ -0,0 +1,190 @@
+"""Headless benchmarks of the dashboard against synthetic datasets.
+
+For every dataset size the app is run with streamlit's AppTest in a fresh
+process, measuring:
+
+- cold start: the first run, converting the CSV and building every cache
+- warm start: a first run in a new process once the converted cache exists
+- rerun latency for representative sidebar filter combinations
+- build time of each dashboard section
+- peak RSS of the process
+
+Results are printed and written as JSON, so runs from different commits can be
+compared. The figure cache is disabled so every rerun builds its charts.
+
+    python benchmarks/run.py --rows 290000 2900000 --output results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+DEFAULT_ROWS = [290_000, 2_900_000, 29_000_000]
+
+# Sidebar states measured on every dataset: name -> function of the app's filter options
+FILTER_STATES = {
+    "default": lambda options, dates: {},
+    "one_gender": lambda options, dates: {"Gender": options["Gender"][:1]},
+    "three_countries": lambda options, dates: {"Country": options["Country"][:3]},
+    "occupation_one_month": lambda options, dates: {
+        "Occupation": options["Occupation"][:2],
+        "dates": (dates[0], dates[0] + datetime.timedelta(days=30)),
+    },
+    "all_filters": lambda options, dates: {
+        "Gender": options["Gender"][-1:],
+        "Country": options["Country"][::2],
+        "Occupation": options["Occupation"][1:],
+        "dates": (dates[0] + datetime.timedelta(days=90), dates[1]),
+    },
+}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def _apply(at, state, dates):
+    for widget, col in zip(at.sidebar.multiselect, ["Gender", "Country", "Occupation"]):
+        widget.set_value(state.get(col, []))
+    start_date, end_date = state.get("dates", dates)
+    at.sidebar.date_input[0].set_value(start_date)
+    at.sidebar.date_input[1].set_value(end_date)
+
+
+def measure(repeats):
+    """Benchmark the app configured by the environment, in this process."""
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    import charts
+
+    results = {}
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=3600)
+    results["start_s"] = _timed_run(at)
+
+    options = {
+        col: list(widget.options)
+        for widget, col in zip(at.sidebar.multiselect, ["Gender", "Country", "Occupation"])
+    }
+    dates = (at.sidebar.date_input[0].value, at.sidebar.date_input[1].value)
+
+    results["reruns"] = {}
+    for name, make_state in FILTER_STATES.items():
+        _apply(at, make_state(options, dates), dates)
+        times = [_timed_run(at) for _ in range(repeats)]
+        results["reruns"][name] = {"median_s": statistics.median(times), "min_s": min(times)}
+    _apply(at, {}, dates)
+    _timed_run(at)
+
+    # Lazy mode has a section selector; with every tab rendered there's only the whole page
+    results["sections"] = {}
+    if len(at.radio):
+        for section in charts.SECTIONS:
+            at.radio[0].set_value(section)
+            times = [_timed_run(at) for _ in range(repeats)]
+            results["sections"][section] = statistics.median(times)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def _worker(dataset, cache_dir, repeats):
+    env = dict(
+        os.environ,
+        MHD_DATASET_PATH=dataset,
+        MHD_CACHE_DIR=cache_dir,
+        MHD_INCOMING_DIR="",
+        MHD_REFRESH_SECONDS="0",
+        MHD_FIGURE_CACHE_MB="0",
+    )
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", "--repeats", str(repeats)],
+        env=env, check=True, stdout=subprocess.PIPE, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def benchmark(rows, repeats):
+    from generate import generate
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    dataset = os.path.join(DATA_DIR, f"survey_{rows}.csv")
+    if not os.path.exists(dataset):
+        print(f"Generating {rows:,} rows", file=sys.stderr)
+        generate(rows, dataset)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = _worker(dataset, cache_dir, repeats)
+        warm = _worker(dataset, cache_dir, repeats)
+    return {
+        "rows": rows,
+        "cold_start_s": cold["start_s"],
+        "warm_start_s": warm["start_s"],
+        "reruns": warm["reruns"],
+        "sections": warm["sections"],
+        "peak_rss_mb": max(cold["peak_rss_mb"], warm["peak_rss_mb"]),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, check=True,
+                              stdout=subprocess.PIPE, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--repeats", type=int, default=3, help="runs per measurement, the median is reported")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.repeats)))
+        return
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": [],
+    }
+    for rows in args.rows:
+        result = benchmark(rows, args.repeats)
+        report["results"].append(result)
+        print(f"{rows:>12,} rows  cold {result['cold_start_s']:.2f}s  warm {result['warm_start_s']:.2f}s  "
+              f"rerun {result['reruns']['default']['median_s']:.3f}s  peak RSS {result['peak_rss_mb']:.0f} MiB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+import collections
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+import countries
+
+# Dashboard Sections (header -> tab label), in layout order
+SECTIONS = {
+    "Overview": ":bar_chart: Overview",
+    "Demographics": ":earth_africa: Demographics",
+    "Mental Health Insights": ":brain: Mental Health Insights",
+    "Work-Related Insights": ":briefcase: Work-Related Insights",
+    "Treatment and Care": ":pill: Treatment and Care",
+    "Associations": ":link: Associations",
+}
+
+# Chart Registry: every chart builds its figure from the filtered aggregates
+# (agg) and the unfiltered ones (overall), and registers in layout order
+Chart = collections.namedtuple("Chart", ["id", "section", "build", "caption"])
+CHARTS = {}
+
+
+def chart(chart_id, section, caption):
+    def register(build):
+        CHARTS[chart_id] = Chart(chart_id, section, build, caption)
+        return build
+    return register
+
+
+def section_charts(section):
+    return [c for c in CHARTS.values() if c.section == section]
+
+
+# Overall Statistics shown above the Overview charts (label -> value)
+def overview_metrics(agg):
+    occupations = agg.counts("Occupation")
+    years = agg.over_time("Y")["Year"]
+    return {
+        "Total Responses": int(agg.size),
+        "Countries Represented": agg.nunique("Country"),
+        "Occupations": int((occupations["Occupation"] != "Others").sum()),
+        "Years Covered": f"{years.min()} - {years.max()}",
+    }
+
+
+# Shared Map Template: the geo styling every choropleth uses, instead of a full theme per figure
+MAP_TEMPLATE = go.layout.Template(layout={
+    "geo": {
+        "showframe": False,
+        "showland": True,
+        "landcolor": "#E5ECF6",
+        "showlakes": True,
+        "lakecolor": "white",
+        "bgcolor": "white",
+        "subunitcolor": "white",
+    },
+})
+
+
+def _country_codes(agg, frame):
+    # Codes are resolved once per set of country labels, not on every render
+    return frame["Country"].map(countries.iso3(agg.labels["Country"]))
+
+
+def _choropleth(agg, frame, title, colorbar_title):
+    """Respondents per country as a map, sent to the browser as ISO-3 codes and counts only."""
+    codes = _country_codes(agg, frame)
+    known = codes.notna()
+    figure = go.Figure(go.Choropleth(
+        locations=codes[known],
+        locationmode="ISO-3",
+        z=frame.loc[known, "Total_Responses"],
+        colorscale=px.colors.sequential.Blues,
+        colorbar={"title": {"text": colorbar_title}},
+        hovertemplate="%{location}: %{z}<extra></extra>",
+    ))
+    return figure.update_layout(template=MAP_TEMPLATE, title={"text": title})
+
+
+# Participation By Year Over Time (Line Chart)
+@chart("participation_over_time", "Overview",
+       "This line chart shows how survey participation has changed over the years. You can see which years had the highest engagement and how participation trends evolved.")
+def participation_over_time(agg, overall):
+    response_by_year = overall.over_time("Y")
+
+    return px.line(response_by_year,
+                   x="Year", y="Total_Responses",
+                   title="Participation Over Time",
+                   labels={"Year": "Year", "Total_Responses": "Number of Respondents"},
+                   markers=True)
+
+
+# Country Distribution (Choropleth Map)
+@chart("country_distribution", "Demographics",
+       "This map shows the global distribution of survey respondents. Darker colors indicate countries with more participants. The visualization helps identify which regions are most represented, and it suggests areas where mental health awareness or survey access may be higher.")
+def country_distribution(agg, overall):
+    response_by_country = agg.counts("Country")
+    return _choropleth(agg, response_by_country, "Country Distribution", "Number of Respondents")
+
+
+# Gender Distribution (Pie Chart)
+@chart("gender_distribution", "Demographics",
+       "This pie chart shows the gender breakdown of respondents. The chart highlights whether the survey had a balanced gender representation, revealing potential disparities that could influence the interpretation of mental health trends.")
+def gender_distribution(agg, overall):
+    response_by_gender = agg.counts("Gender")
+
+    return px.pie(response_by_gender,
+                  names="Gender",
+                  values="Total_Responses",
+                  title="Gender Distribution")
+
+
+# History of Mental Health Distribution (Bar chart)
+@chart("mental_health_history", "Mental Health Insights",
+       "This bar chart shows the distribution of respondents who have a history of mental health issues. It helps illustrate how common mental health challenges are within this survey group.")
+def mental_health_history(agg, overall):
+    response_by_mental_health_history = agg.counts("Mental_Health_History")
+    return px.bar(response_by_mental_health_history,
+                  x="Mental_Health_History", y="Total_Responses", 
+                  title="Mental Health History Distribution",
+                  labels={"Mental_Health_History": "History of Mental Health", "Total_Responses": "Number of Respondents"})
+
+
+# Family History Distribution (Bar Chart)
+@chart("family_history", "Mental Health Insights",
+       "This chart shows how many respondents have a family history of mental illness. It offers insights into the potential hereditary factors of mental health struggles.")
+def family_history(agg, overall):
+    response_by_family_history = agg.counts("family_history")
+    return px.bar(response_by_family_history,
+                  x="family_history", y="Total_Responses",
+                  title="Family History of Mental Illness Distribution",
+                  labels={"family_history": "Family History", "Total_Responses": "Number of Respondents"})
+
+
+# Mental Health Interview Distribution (Pie Chart)
+@chart("mental_health_interview", "Mental Health Insights",
+       "This pie chart shows the proportion of respondents who have had a mental health interview. It gives insight into how often respondents have sought professional help.")
+def mental_health_interview(agg, overall):
+    response_by_interview = agg.counts("mental_health_interview")
+    return px.pie(response_by_interview,
+                  names="mental_health_interview",
+                  values="Total_Responses",
+                  title="Mental Health Interview Distribution",
+                  labels={"mental_health_interview": "Mental Health Interview", "Total_Responses": "Number of Respondents"})
+
+
+# Growing Stress Distribution (Bar chart)
+@chart("growing_stress", "Mental Health Insights",
+       "This bar chart shows the number of respondents reporting growing levels of stress. It highlights the prevalence of stress within the survey group.")
+def growing_stress(agg, overall):
+    response_by_stress_levels = agg.counts("Growing_Stress")
+    return px.bar(response_by_stress_levels,
+                  x="Growing_Stress", y="Total_Responses",
+                  title="Growing Stress Distribution",
+                  labels={"Growing_Stress": "Growing Stress", "Total_Responses": "Number of Respondents"})
+
+
+# Mood Swings Distribution (Bar chart)
+@chart("mood_swings", "Mental Health Insights",
+       "This bar chart shows the distribution of respondents who experience mood swings. It offers insights into how common mood swings are in this survey group.")
+def mood_swings(agg, overall):
+    response_by_mood_swings = agg.counts("Mood_Swings")
+    return px.bar(response_by_mood_swings,
+                 x="Mood_Swings", y="Total_Responses",
+                 title="Mood Swings Distribution",
+                 labels={"Mood_Swings": "Mood Swings", "Total_Responses": "Number of Respondents"})
+
+
+# Social Weakness Distribution (Bar chart)
+@chart("social_weakness", "Mental Health Insights",
+       "This bar chart shows how many respondents report experiencing social weakness. It helps to identify the prevalence of social difficulties among the participants.")
+def social_weakness(agg, overall):
+    response_by_social_weakness = agg.counts("Social_Weakness")
+    return px.bar(response_by_social_weakness,
+                  x="Social_Weakness", y="Total_Responses",
+                  title="Social Weakness Distribution",
+                  labels={"Social_Weakness": "Social Weakness", "Total_Responses": "Number of Respondents"})
+
+
+# Days Indoors Distribution (Bar chart)
+@chart("days_indoors", "Mental Health Insights",
+       "This bar chart shows the number of days respondents spend indoors. It helps analyze how indoor activity may affect mental health.")
+def days_indoors(agg, overall):
+    response_by_days_indoors = agg.counts("Days_Indoors")
+    return px.bar(response_by_days_indoors,
+                  x="Days_Indoors", y="Total_Responses",
+                  title="Days Indoors Distribution",
+                  labels={"Days_Indoors": "Days Indoors", "Total_Responses": "Number of Respondents"})
+
+
+# Coping Struggles Distribution (Bar chart)
+@chart("coping_struggles", "Mental Health Insights",
+       "This bar chart shows how many respondents are struggling with coping. It highlights the extent of coping difficulties in this group.")
+def coping_struggles(agg, overall):
+    response_by_coping_struggles = agg.counts("Coping_Struggles")
+    return px.bar(response_by_coping_struggles,
+                  x="Coping_Struggles", y="Total_Responses",
+                  title="Coping Struggles Distribution",
+                  labels={"Coping_Struggles": "Coping Struggles", "Total_Responses": "Number of Respondents"})
+
+
+# Days Indoors vs Coping Struggles (Heatmap)
+@chart("indoors_vs_coping", "Mental Health Insights",
+       "This heatmap shows the correlation between the number of days spent indoors and coping struggles. It helps identify how indoor activity might be related to mental health difficulties.")
+def indoors_vs_coping(agg, overall):
+    response_by_days_indoors = agg.counts("Days_Indoors", "Coping_Struggles")
+    return px.density_heatmap(response_by_days_indoors,
+                              x="Days_Indoors", y="Coping_Struggles",
+                              z="Total_Responses",
+                              title="Correlation Between Days Spent Indoors and Coping Struggles",
+                              labels={"Days_Indoors": "Days Indoors", "Coping_Struggles": "Coping Struggles", "Total_Responses": "respondents"},
+                              color_continuous_scale=px.colors.sequential.Blues)
+
+
+def _country_coping(agg):
+    response_by_country_coping = agg.counts("Country", "Coping_Struggles")
+    return response_by_country_coping[response_by_country_coping["Coping_Struggles"] == "Yes"]
+
+
+# Regional Differences in Coping Struggles (Choropleth)
+@chart("country_coping", "Mental Health Insights",
+       "This map highlights the regional differences in coping struggles, showing which countries report the highest levels of difficulty.")
+def country_coping(agg, overall):
+    response_by_country_coping = _country_coping(agg)
+    return _choropleth(agg, response_by_country_coping, "Regional Differences in Coping Struggles", "Number of Respondents")
+
+
+# Complementary Bar Chart Showing The Top 10 Countries Struggling (Bar Chart)
+@chart("top_10_countries_coping", "Mental Health Insights",
+       "This bar chart complements the chart above, showing the top 10 countries where respondents report the most coping struggles. It provides insight into regional mental health challenges.")
+def top_10_countries_coping(agg, overall):
+    top_10_countries = _country_coping(agg).sort_values(by="Total_Responses", ascending=False).head(10)
+    return px.bar(top_10_countries, 
+                  x="Country", y="Total_Responses",
+                  title="Top 10 Countries with Highest Coping Struggles", 
+                  labels={"Country": "Country", "Total_Responses": "Number of Struggles"})
+
+
+# Habit Changes Distribution (Bar chart)
+@chart("changes_habits", "Mental Health Insights",
+       "This bar chart shows the distribution of respondents who have experienced changes in habits. It helps to identify how common these changes are in the group.")
+def changes_habits(agg, overall):
+    response_by_changes_habits = agg.counts("Changes_Habits")
+    return px.bar(response_by_changes_habits,
+                  x="Changes_Habits", y="Total_Responses",
+                  title="Habit Changes Distribution",
+                  labels={"Changes_Habits": "Changes in Habits", "Total_Responses": "Number of Respondents"})
+
+
+# Habit Changes vs Coping Struggles (Stacked Bar Chart)
+@chart("habit_changes_vs_coping", "Mental Health Insights",
+       "This stacked bar chart shows the relationship between habit changes and coping struggles. It highlights how changes in behavior may relate to mental health difficulties.")
+def habit_changes_vs_coping(agg, overall):
+    response_by_habit_changes = agg.counts("Changes_Habits", "Coping_Struggles")
+    return px.bar(response_by_habit_changes,
+                  x="Changes_Habits", y="Total_Responses",
+                  color="Coping_Struggles",
+                  title="Correlation Between Habit Changes and Coping Struggles",
+                  labels={"Changes_Habits": "Changes in Habits", "Total_Responses": "Number of Respondents"},
+                  barmode="stack")
+
+
+# Mood Swings vs Gender (Grouped Bar Chart)
+@chart("gender_vs_mood_swings", "Mental Health Insights",
+       "This grouped bar chart shows the relationship between gender and mood swings. It offers insight into whether certain genders report more mood swings.")
+def gender_vs_mood_swings(agg, overall):
+    response_by_mood_swings = agg.counts("Gender", "Mood_Swings")
+    return px.bar(response_by_mood_swings,
+                  x="Gender", y="Total_Responses",
+                  color="Mood_Swings",
+                  title="Correlation Between Gender and Mood Swings",
+                  labels={"Gender": "Gender", "Total_Responses": "Number of Respondents"},
+                  barmode="group")
+
+
+# Family History vs Mood Swings (Bar Chart)
+@chart("family_history_vs_mood_swings", "Mental Health Insights",
+       "This stacked bar chart shows the relationship between family history of mental illness and mood swings. It highlights potential hereditary factors influencing mood swings.")
+def family_history_vs_mood_swings(agg, overall):
+    response_by_family_mood_swings = agg.counts("family_history", "Mood_Swings")
+    return px.bar(response_by_family_mood_swings,
+                  x="family_history", y="Total_Responses",
+                  color="Mood_Swings",
+                  title="Correlation Between Family History and Mood Swings",
+                  labels={"family_history": "Family History", "Mood_Swings": "Mood Swings", "Total_Responses": "Number of Respondents"})
+
+
+# Occupation Distribution (Bar Chart)
+@chart("occupation", "Work-Related Insights",
+       "This chart breaks down respondents by occupation. It highlights which professions are most represented in the survey and helps provide context for analyzing mental health trends by job role.")
+def occupation(agg, overall):
+    response_by_occupation = agg.counts("Occupation").sort_values(by="Total_Responses", ascending=False)
+    return px.bar(response_by_occupation,
+                  x="Occupation", y="Total_Responses",
+                  title="Occupation Distribution",
+                  labels={"Occupation": "Occupation", "Total_Responses": "Number of Respondents"})
+
+
+# Self-Employment Distribution (Bar Chart)
+@chart("self_employment", "Work-Related Insights",
+       "This chart shows the distribution of self-employed respondents. It highlights the prevalence of self-employment in the survey group and its potential link to mental health.")
+def self_employment(agg, overall):
+    response_by_self_employment = agg.counts("self_employed")
+    response_by_self_employment = response_by_self_employment[response_by_self_employment["self_employed"] != "Not specified"].sort_values(by="Total_Responses", ascending=False)
+    return px.bar(response_by_self_employment,
+                  x="self_employed", y="Total_Responses",
+                  title="Self-Employment Distribution",
+                  labels={"self_employed": "Self-Employment Status", "Total_Responses": "Number of Respondents"})
+
+
+# Work Interest Distribution (Bar chart)
+@chart("work_interest", "Work-Related Insights",
+       "This chart shows the distribution of respondents interest in their work. It helps provide insight into how work engagement may influence mental health.")
+def work_interest(agg, overall):
+    response_by_work_interest = agg.counts("Work_Interest")
+    return px.bar(response_by_work_interest,
+               x="Work_Interest", y="Total_Responses",
+               title="Work Interest Distribution",
+               labels={"Work_Interest": "Work Interest", "Total_Responses": "Number of Respondents"})
+
+
+# Occupations with the Highest Stress Levels (Horizontal Bar Chart)
+@chart("occupation_stress", "Work-Related Insights",
+       "This bar chart highlights which occupations report the highest levels of stress. It helps identify which job roles may be more prone to mental health struggles due to work-related stress.")
+def occupation_stress(agg, overall):
+    response_by_occupation_stress = agg.counts("Occupation", "Growing_Stress")
+    response_by_occupation_stress = response_by_occupation_stress[response_by_occupation_stress["Growing_Stress"] == "Yes"]
+    response_by_occupation_stress = response_by_occupation_stress.sort_values(by="Total_Responses", ascending=True)
+    return px.bar(response_by_occupation_stress,
+                  x="Total_Responses", y="Occupation",
+                  title="Occupations with the Highest Stress Levels",
+                  labels={"Total_Responses": "Number of Respondents", "Occupation": "Occupation"})
+
+
+# Treatment Status Distribution (Bar chart)
+@chart("treatment", "Treatment and Care",
+       "This bar chart shows how many respondents have received mental health treatment. It helps understand the level of engagement with mental health care among survey participants.")
+def treatment(agg, overall):
+    response_by_treatment = agg.counts("treatment")
+    return px.bar(response_by_treatment,
+                  x="treatment", y="Total_Responses",
+                  title="Treatment Status Distribution",
+                  labels={"treatment": "Treatment Status", "Total_Responses": "Number of Respondents"})
+
+
+# Care Options Distribution (Pie Chart)
+@chart("care_options", "Treatment and Care",
+       "This pie chart shows the distribution of mental health care options available to respondents. It highlights the availability of care resources.")
+def care_options(agg, overall):
+    response_by_care_options = agg.counts("care_options")
+    return px.pie(response_by_care_options,
+               names="care_options",
+               values="Total_Responses",
+               title="Care Options Distribution",
+               labels={"care_options": "Care Options", "Total_Responses": "Number of Respondents"})
+
+
+# Care Options Distribution by country (Choropleth map)
+@chart("care_options_by_country", "Treatment and Care",
+       "This map highlights access to mental health care options by country. It helps identify regions with better access to care and areas where care might be lacking. It's important to note that some countries may have mixed responses, so this reflects the dominant opinion, not all opinions.")
+def care_options_by_country(agg, overall):
+    # The most common answer per country, one map colour per answer
+    response_by_care_options = agg.counts("Country", "care_options")
+    dominant = response_by_care_options.sort_values("Total_Responses", ascending=False, kind="stable")
+    dominant = dominant.drop_duplicates("Country").assign(Code=lambda d: _country_codes(agg, d)).dropna(subset=["Code"])
+
+    figure = go.Figure()
+    for option, color in zip(agg.labels["care_options"], px.colors.qualitative.Plotly):
+        rows = dominant[dominant["care_options"] == option]
+        if rows.empty:
+            continue
+        figure.add_trace(go.Choropleth(
+            locations=rows["Code"],
+            locationmode="ISO-3",
+            z=rows["Total_Responses"],
+            name=option,
+            colorscale=[[0, color], [1, color]],
+            showscale=False,
+            showlegend=True,
+            hovertemplate="%{location}: %{z} respondents",
+        ))
+    return figure.update_layout(template=MAP_TEMPLATE,
+                                title={"text": "Access to Mental Health Care Options by Country"},
+                                legend={"title": {"text": "Care Options"}})
+
+
+# Gender vs Treatment (Stacked Bar Chart)
+@chart("gender_vs_treatment", "Treatment and Care",
+       "This chart shows the relationship between gender and engagement with mental health treatment. It provides insights into whether certain genders are more likely to seek help and receive treatment.")
+def gender_vs_treatment(agg, overall):
+    response_by_gender_treatment = agg.counts("Gender", "treatment")
+    return px.bar(response_by_gender_treatment, 
+                  x="Gender", y="Total_Responses",
+                  color="treatment",
+                  title="Correlation Between Gender and Mental Health Treatment",
+                  labels={"Gender": "Gender", "Total_Responses": "Number of Respondents"},
+                  barmode="stack")
+
+
+# Treatment vs Mood Swings (Stacked Bar chart)
+@chart("treatment_vs_mood_swings", "Treatment and Care",
+       "This chart shows how receiving mental health treatment relates to mood swings. It helps to assess whether treatment has an impact on emotional stability.")
+def treatment_vs_mood_swings(agg, overall):
+    response_by_treatment_mood_swings = agg.counts("treatment", "Mood_Swings")
+    return px.bar(response_by_treatment_mood_swings,
+                  x="treatment", y="Total_Responses", 
+                  color="Mood_Swings",
+                  title="Correlation Between Mental Health Treatment and Mood Swings",
+                  labels={"treatment": "Treatment", "Mood_Swings": "Mood Swings", "Total_Responses": "Number of Respondents"},
+                  barmode="stack")
+
+
+# Treatment vs Family History of Mental Illness (Stacked Bar Chart)
+@chart("treatment_vs_family_history", "Treatment and Care",
+       "This chart explores the relationship between a family history of mental illness and receiving treatment. It offers insight into how genetic factors may influence the decision to seek help.")
+def treatment_vs_family_history(agg, overall):
+    response_by_family_history = agg.counts("treatment", "family_history")
+    return px.bar(response_by_family_history,
+                  x="treatment", y="Total_Responses",
+                  color="family_history",
+                  title="Correlation Between Family History of Mental Illness and Treatment",
+                  labels={"family_history": "Family History of Mental Illness", "treatment": "Treatment", "Total_Responses": "Number of Respondents"},
+                  barmode="stack")
+
+
+def column_title(col):
+    return col.replace("_", " ").title() if col.islower() else col.replace("_", " ")
+
+
+# Any Two Survey Columns (Heatmap), picked in the Associations section
+def crosstab_heatmap(crosstabs, col_a, col_b):
+    title_a, title_b = column_title(col_a), column_title(col_b)
+    return px.density_heatmap(crosstabs.counts(col_a, col_b),
+                              x=col_a, y=col_b,
+                              z="Total_Responses",
+                              title=f"Association Between {title_a} and {title_b} (Cramér's V {crosstabs.association(col_a, col_b):.2f})",
+                              labels={col_a: title_a, col_b: title_b, "Total_Responses": "respondents"},
+                              color_continuous_scale=px.colors.sequential.Blues)
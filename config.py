@@ -0,0 +1,51 @@
+import os
+
+# Dataset Location
+DATASET_PATH = os.environ.get("MHD_DATASET_PATH", "mental_health_dataset.csv")
+
+# Drop Directory for new survey batches (CSV files with the dataset's columns)
+INCOMING_DIR = os.environ.get("MHD_INCOMING_DIR", "incoming")
+
+# How often to look for appended CSV rows and new batch files (0 disables it)
+REFRESH_SECONDS = float(os.environ.get("MHD_REFRESH_SECONDS", "60"))
+
+# Columnar Cache Location (converted copy of the CSV)
+CACHE_DIR = os.environ.get("MHD_CACHE_DIR", ".cache")
+
+# Shared Dataset Directory: when set, the dashboard attaches to the dataset publish.py
+# keeps there instead of loading the CSV itself (e.g. /dev/shm/mhd, shared by all workers)
+SHARED_DIR = os.environ.get("MHD_SHARED_DIR", "")
+
+# Where filtered counts come from (see backends.BACKENDS): the pre-aggregated count cube,
+# the rows held in memory, or a Parquet copy on disk for datasets larger than memory.
+# MHD_USE_CUBE=0 is still understood as "memory".
+BACKEND = os.environ.get("MHD_BACKEND", "cube" if os.environ.get("MHD_USE_CUBE", "1") != "0" else "memory")
+
+# Build only the section picked in the selector instead of every tab on each rerun
+LAZY_SECTIONS = os.environ.get("MHD_LAZY_SECTIONS", "1") != "0"
+
+# Progressive Mode: on datasets with more than SAMPLE_THRESHOLD rows, draw every chart
+# from a stratified sample of about SAMPLE_ROWS rows first, then replace it with exact counts
+PROGRESSIVE = os.environ.get("MHD_PROGRESSIVE", "0") != "0"
+SAMPLE_THRESHOLD = int(os.environ.get("MHD_SAMPLE_THRESHOLD", "1000000"))
+SAMPLE_ROWS = int(os.environ.get("MHD_SAMPLE_ROWS", "100000"))
+
+# Filter states whose contingency tables (every column pair) are kept for the Associations section
+CROSSTAB_CACHE_ENTRIES = int(os.environ.get("MHD_CROSSTAB_CACHE_ENTRIES", "32"))
+
+# Pre-rendered Views: where prerender.py writes the figures of the default view and the
+# presets listed in PRESETS_FILE, served as is when the sidebar matches one of them
+PRERENDER_DIR = os.environ.get("MHD_PRERENDER_DIR", os.path.join(CACHE_DIR, "prerendered"))
+PRESETS_FILE = os.environ.get("MHD_PRESETS_FILE", "presets.json")
+
+# Memory budget for cached figures shared by all sessions (0 disables the cache)
+FIGURE_CACHE_MB = float(os.environ.get("MHD_FIGURE_CACHE_MB", "64"))
+
+# Offer a performance panel in the sidebar (stage timings, figure cache stats, metrics download)
+DEBUG_PANEL = os.environ.get("MHD_DEBUG_PANEL", "0") != "0"
+
+# Count allocations per stage with tracemalloc (slows every rerun down noticeably)
+TRACE_ALLOCATIONS = os.environ.get("MHD_TRACE_ALLOCATIONS", "0") != "0"
+
+# Prometheus textfile the stage metrics are written to after every rerun (empty disables it)
+METRICS_FILE = os.environ.get("MHD_METRICS_FILE", "")
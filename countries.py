@@ -0,0 +1,68 @@
+import functools
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Country Name -> ISO 3166-1 alpha-3 Code (the survey's spellings plus common alternatives)
+ISO3 = {
+    "Afghanistan": "AFG", "Albania": "ALB", "Algeria": "DZA", "Andorra": "AND", "Angola": "AGO",
+    "Argentina": "ARG", "Armenia": "ARM", "Australia": "AUS", "Austria": "AUT", "Azerbaijan": "AZE",
+    "Bahamas": "BHS", "Bahrain": "BHR", "Bangladesh": "BGD", "Barbados": "BRB", "Belarus": "BLR",
+    "Belgium": "BEL", "Belize": "BLZ", "Benin": "BEN", "Bhutan": "BTN", "Bolivia": "BOL",
+    "Bosnia and Herzegovina": "BIH", "Botswana": "BWA", "Brazil": "BRA", "Brunei": "BRN",
+    "Bulgaria": "BGR", "Burkina Faso": "BFA", "Burundi": "BDI", "Cambodia": "KHM", "Cameroon": "CMR",
+    "Canada": "CAN", "Cape Verde": "CPV", "Central African Republic": "CAF", "Chad": "TCD",
+    "Chile": "CHL", "China": "CHN", "Colombia": "COL", "Comoros": "COM", "Congo": "COG",
+    "Costa Rica": "CRI", "Croatia": "HRV", "Cuba": "CUB", "Cyprus": "CYP", "Czech Republic": "CZE",
+    "Czechia": "CZE", "Democratic Republic of the Congo": "COD", "Denmark": "DNK", "Djibouti": "DJI",
+    "Dominican Republic": "DOM", "Ecuador": "ECU", "Egypt": "EGY", "El Salvador": "SLV",
+    "Equatorial Guinea": "GNQ", "Eritrea": "ERI", "Estonia": "EST", "Eswatini": "SWZ",
+    "Ethiopia": "ETH", "Fiji": "FJI", "Finland": "FIN", "France": "FRA", "Gabon": "GAB",
+    "Gambia": "GMB", "Georgia": "GEO", "Germany": "DEU", "Ghana": "GHA", "Greece": "GRC",
+    "Guatemala": "GTM", "Guinea": "GIN", "Guinea-Bissau": "GNB", "Guyana": "GUY", "Haiti": "HTI",
+    "Honduras": "HND", "Hong Kong": "HKG", "Hungary": "HUN", "Iceland": "ISL", "India": "IND",
+    "Indonesia": "IDN", "Iran": "IRN", "Iraq": "IRQ", "Ireland": "IRL", "Israel": "ISR",
+    "Italy": "ITA", "Ivory Coast": "CIV", "Jamaica": "JAM", "Japan": "JPN", "Jordan": "JOR",
+    "Kazakhstan": "KAZ", "Kenya": "KEN", "Kosovo": "XKX", "Kuwait": "KWT", "Kyrgyzstan": "KGZ",
+    "Laos": "LAO", "Latvia": "LVA", "Lebanon": "LBN", "Lesotho": "LSO", "Liberia": "LBR",
+    "Libya": "LBY", "Liechtenstein": "LIE", "Lithuania": "LTU", "Luxembourg": "LUX",
+    "Madagascar": "MDG", "Malawi": "MWI", "Malaysia": "MYS", "Maldives": "MDV", "Mali": "MLI",
+    "Malta": "MLT", "Mauritania": "MRT", "Mauritius": "MUS", "Mexico": "MEX", "Moldova": "MDA",
+    "Monaco": "MCO", "Mongolia": "MNG", "Montenegro": "MNE", "Morocco": "MAR", "Mozambique": "MOZ",
+    "Myanmar": "MMR", "Namibia": "NAM", "Nepal": "NPL", "Netherlands": "NLD", "New Zealand": "NZL",
+    "Nicaragua": "NIC", "Niger": "NER", "Nigeria": "NGA", "North Korea": "PRK",
+    "North Macedonia": "MKD", "Macedonia": "MKD", "Norway": "NOR", "Oman": "OMN", "Pakistan": "PAK",
+    "Palestine": "PSE", "Panama": "PAN", "Papua New Guinea": "PNG", "Paraguay": "PRY", "Peru": "PER",
+    "Philippines": "PHL", "Poland": "POL", "Portugal": "PRT", "Qatar": "QAT", "Romania": "ROU",
+    "Russia": "RUS", "Russian Federation": "RUS", "Rwanda": "RWA", "Saudi Arabia": "SAU",
+    "Senegal": "SEN", "Serbia": "SRB", "Sierra Leone": "SLE", "Singapore": "SGP", "Slovakia": "SVK",
+    "Slovenia": "SVN", "Somalia": "SOM", "South Africa": "ZAF", "South Korea": "KOR",
+    "South Sudan": "SSD", "Spain": "ESP", "Sri Lanka": "LKA", "Sudan": "SDN", "Suriname": "SUR",
+    "Sweden": "SWE", "Switzerland": "CHE", "Syria": "SYR", "Taiwan": "TWN", "Tajikistan": "TJK",
+    "Tanzania": "TZA", "Thailand": "THA", "Togo": "TGO", "Trinidad and Tobago": "TTO",
+    "Tunisia": "TUN", "Turkey": "TUR", "Turkmenistan": "TKM", "Uganda": "UGA", "Ukraine": "UKR",
+    "United Arab Emirates": "ARE", "United Kingdom": "GBR", "UK": "GBR", "United States": "USA",
+    "United States of America": "USA", "USA": "USA", "Uruguay": "URY", "Uzbekistan": "UZB",
+    "Venezuela": "VEN", "Vietnam": "VNM", "Yemen": "YEM", "Zambia": "ZMB", "Zimbabwe": "ZWE",
+}
+
+
+@functools.lru_cache(maxsize=8)
+def _codes(names):
+    return pd.Series([ISO3.get(name) for name in names], index=list(names), dtype=object)
+
+
+def iso3(names):
+    """ISO-3 codes for country names (None where the name is unknown), resolved once per set of names."""
+    return _codes(tuple(names))
+
+
+def report_unmatched(names):
+    """Log the country names the maps can't place; returns them."""
+    codes = iso3(names)
+    unmatched = list(codes.index[codes.isna()])
+    if unmatched:
+        logger.warning("No ISO-3 code for countries %s, they are left off the maps", ", ".join(map(str, unmatched)))
+    return unmatched
@@ -0,0 +1,60 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from aggregations import count_table
+from dataset import CATEGORICAL_COLUMNS
+
+# Every pair of survey columns, in column order
+PAIRS = list(itertools.combinations(CATEGORICAL_COLUMNS, 2))
+
+
+def cramers_v(table):
+    """Bias-corrected Cramér's V of a dense contingency table: 0 when the columns are
+    independent, 1 when one determines the other. Answers nobody gave are left out.
+
+    The correction (Bergsma, 2013) keeps columns with many answers, e.g. Country,
+    from ranking high on noise alone.
+    """
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    n = table.sum()
+    rows, cols = table.shape
+    if n < 2 or min(rows, cols) < 2:
+        return 0.0
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    phi2 = ((table - expected) ** 2 / expected).sum() / n
+    phi2 = max(0.0, phi2 - (rows - 1) * (cols - 1) / (n - 1))
+    rows_corrected = rows - (rows - 1) ** 2 / (n - 1)
+    cols_corrected = cols - (cols - 1) ** 2 / (n - 1)
+    denominator = min(rows_corrected, cols_corrected) - 1
+    return float(np.sqrt(phi2 / denominator)) if denominator > 0 else 0.0
+
+
+class Crosstabs:
+    """The contingency table of every pair of survey columns for one filter state, with Cramér's V.
+
+    agg must count every pair in PAIRS (see pair_counts() on the query backends).
+    """
+
+    def __init__(self, agg, pairs=PAIRS):
+        self.agg = agg
+        self.associations = {pair: cramers_v(agg.table(*pair)) for pair in pairs}
+
+    def _pair(self, col_a, col_b):
+        return (col_a, col_b) if (col_a, col_b) in self.associations else (col_b, col_a)
+
+    def association(self, col_a, col_b):
+        return self.associations[self._pair(col_a, col_b)]
+
+    def counts(self, col_a, col_b):
+        """The pair's (col_a, col_b, Total_Responses) frame, as Aggregates.counts() returns it."""
+        pair = self._pair(col_a, col_b)
+        frame = count_table(pair, self.agg.labels, self.agg.table(*pair))
+        return frame[[col_a, col_b, "Total_Responses"]]
+
+    def ranking(self):
+        """Every pair, most strongly associated first."""
+        rows = [(col_a, col_b, v) for (col_a, col_b), v in self.associations.items()]
+        ranking = pd.DataFrame(rows, columns=["Column A", "Column B", "Cramér's V"])
+        return ranking.sort_values("Cramér's V", ascending=False, kind="stable", ignore_index=True)
@@ -0,0 +1,221 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import timeline
+from aggregations import ONE_WAY, TWO_WAY, Aggregates, column_codes, counted_columns
+from filters import FILTER_COLUMNS
+
+# Cube Cell Keys: the sidebar filters plus the response day
+DIMENSIONS = FILTER_COLUMNS
+
+
+def _codes_for(series, labels):
+    """Codes of series against a fixed label index (-1 for missing values)."""
+    codes, own_labels = column_codes(series)
+    remap = np.append(labels.get_indexer(own_labels), -1)
+    return remap[codes]
+
+
+def _layout(labels, one_way, two_way):
+    # Each count spec stores only its non-dimension attributes per cell; the
+    # dimension part comes from the cell key at query time
+    blocks, offset = {}, 1
+    for spec in [(col,) for col in one_way] + list(two_way):
+        if sum(col in DIMENSIONS for col in spec) > 1:
+            raise ValueError(f"Count cube supports one filter dimension per spec, got {spec}")
+        attrs = tuple(col for col in spec if col not in DIMENSIONS)
+        if attrs and attrs not in blocks:
+            shape = tuple(len(labels[col]) for col in attrs)
+            blocks[attrs] = (offset, shape)
+            offset += int(np.prod(shape))
+    return blocks, offset
+
+
+class CountCube:
+    """Response counts keyed by (Gender, Country, Occupation, day) for every chart's attributes.
+
+    Each cell holds a row of counts: column 0 is the number of responses and the
+    rest are the per-answer counts of the attribute combinations the charts use.
+    Cells are sorted by day, so a date range is a contiguous block, and a filtered
+    view is a sum over the matching cells instead of a scan over the raw rows.
+    """
+
+    def __init__(self, labels, keys, days, matrix, one_way=ONE_WAY, two_way=TWO_WAY):
+        self.labels = labels
+        self.keys = keys
+        self.days = days
+        self.matrix = matrix
+        self.one_way = list(one_way)
+        self.two_way = [tuple(pair) for pair in two_way]
+        self.blocks, self.width = _layout(labels, self.one_way, self.two_way)
+
+    @classmethod
+    def from_frame(cls, df, one_way=ONE_WAY, two_way=TWO_WAY, labels=None):
+        if labels is None:
+            labels = {}
+            for col in dict.fromkeys([*DIMENSIONS, *counted_columns(one_way, two_way)]):
+                labels[col] = column_codes(df[col])[1]
+        blocks, width = _layout(labels, one_way, two_way)
+
+        codes = {col: _codes_for(df[col], labels[col]) for col in labels}
+        days, valid = timeline.day_numbers(df["Timestamp"])
+        for col in DIMENSIONS:
+            valid &= codes[col] >= 0
+        codes = {col: col_codes[valid] for col, col_codes in codes.items()}
+        days = days[valid]
+
+        # Cell id per row, ordered by day first so the cells come out sorted by day
+        first_day = days.min() if len(days) else 0
+        cell_keys = np.ravel_multi_index(
+            [days - first_day] + [codes[col] for col in FILTER_COLUMNS],
+            [int(days.max() - first_day + 1) if len(days) else 1] + [len(labels[col]) for col in FILTER_COLUMNS],
+        )
+        cells, first_row, cell_of_row = np.unique(cell_keys, return_index=True, return_inverse=True)
+
+        # One bincount over every (cell, measure) position fills the whole matrix
+        positions = [cell_of_row * width]
+        for attrs, (offset, shape) in blocks.items():
+            attr_codes = [codes[col] for col in attrs]
+            known = np.logical_and.reduce([c >= 0 for c in attr_codes])
+            local = np.ravel_multi_index([c[known] for c in attr_codes], shape)
+            positions.append(cell_of_row[known] * width + offset + local)
+        matrix = np.bincount(np.concatenate(positions), minlength=len(cells) * width)
+        matrix = matrix.astype(np.int32).reshape(len(cells), width)
+
+        keys = {col: codes[col][first_row].astype(np.int16) for col in DIMENSIONS}
+        return cls(labels, keys, days[first_row].astype(np.int32), matrix, one_way, two_way)
+
+    def aggregates(self, selections=None, start_date=None, end_date=None):
+        """Aggregates for a filter state, summed from the matching cells.
+
+        Same arguments as filters.FilterIndex.select; a missing start or end date
+        leaves that side of the range open.
+        """
+        lo, hi = timeline.search_range(
+            self.days,
+            None if start_date is None else timeline.day_number(start_date),
+            None if end_date is None else timeline.day_number(end_date) + 1,
+        )
+        mask = None
+        for col, selected in (selections or {}).items():
+            if not len(selected):
+                continue
+            allowed = self.labels[col].isin(list(selected))
+            if allowed.all():
+                continue
+            col_mask = allowed[self.keys[col][lo:hi]]
+            mask = col_mask if mask is None else mask & col_mask
+        cells = slice(lo, hi) if mask is None else np.flatnonzero(mask) + lo
+
+        matrix = self.matrix[cells]
+        # Specs without a filter dimension only need the column sums of the matching cells
+        column_totals = matrix.sum(axis=0, dtype=np.int64)
+        counts = {}
+        for spec in [(col,) for col in self.one_way] + self.two_way:
+            attrs = tuple(col for col in spec if col not in DIMENSIONS)
+            offset, shape = self.blocks[attrs] if attrs else (0, ())
+            width = int(np.prod(shape))
+
+            dims = [col for col in spec if col in DIMENSIONS]
+            if not dims:
+                counts[spec] = column_totals[offset:offset + width].reshape(shape)
+                continue
+            dim = dims[0]
+            dim_codes = self.keys[dim][cells]
+            dense = np.column_stack([
+                np.bincount(dim_codes, weights=matrix[:, column], minlength=len(self.labels[dim]))
+                for column in range(offset, offset + width)
+            ]).astype(np.int64)
+            dense = dense.reshape((len(self.labels[dim]),) + shape)
+            if spec[0] != dim:
+                dense = np.moveaxis(dense, 0, -1)
+            counts[spec] = dense
+
+        # Cells are sorted by day, so responses per day are sums over runs of equal days
+        days = self.days[cells]
+        new_day = np.ones(len(days), dtype=bool)
+        new_day[1:] = days[1:] != days[:-1]
+        starts = np.flatnonzero(new_day)
+        daily = (days[starts].astype(np.int64), np.add.reduceat(matrix[:, 0], starts).astype(np.int64))
+        return Aggregates(int(column_totals[0]), self.labels, counts, daily)
+
+    def relabel(self, labels):
+        """Same counts against a superset of the current labels (e.g. a new country)."""
+        remaps = {col: labels[col].get_indexer(self.labels[col]) for col in self.labels}
+        keys = {col: remaps[col][codes].astype(np.int16) for col, codes in self.keys.items()}
+
+        blocks, width = _layout(labels, self.one_way, self.two_way)
+        matrix = np.zeros((len(self.days), width), dtype=np.int32)
+        matrix[:, 0] = self.matrix[:, 0]
+        for attrs, (offset, shape) in self.blocks.items():
+            new_offset, new_shape = blocks[attrs]
+            old = self.matrix[:, offset:offset + int(np.prod(shape))].reshape((-1,) + shape)
+            new = np.zeros((len(self.days),) + new_shape, dtype=np.int32)
+            new[(slice(None),) + np.ix_(*[remaps[col] for col in attrs])] = old
+            matrix[:, new_offset:new_offset + int(np.prod(new_shape))] = new.reshape(len(self.days), -1)
+        return CountCube(labels, keys, self.days, matrix, self.one_way, self.two_way)
+
+    def append(self, df):
+        """New cube with the rows of df counted in, without revisiting rows counted before."""
+        labels = {
+            col: self.labels[col].union(pd.Index(df[col].dropna().unique()))
+            for col in self.labels
+        }
+        old = self.relabel(labels) if any(len(labels[c]) != len(self.labels[c]) for c in labels) else self
+        new = CountCube.from_frame(df, self.one_way, self.two_way, labels=labels)
+        # Rows without a usable timestamp or filter values add no cells, only answers
+        if not len(new.days):
+            return old
+
+        # Add the batch's cells into matching cells and insert the ones not seen before
+        first_day = min(old.days.min(initial=new.days.min()), new.days.min())
+        old_keys, new_keys = old._cell_keys(first_day), new._cell_keys(first_day)
+        order = np.argsort(old_keys, kind="stable")
+        old_keys = old_keys[order]
+        position = np.searchsorted(old_keys, new_keys)
+        found = position < len(old_keys)
+        found[found] = old_keys[position[found]] == new_keys[found]
+
+        matrix = old.matrix[order]
+        matrix[position[found]] += new.matrix[found]
+        insert_at = position[~found]
+        matrix = np.insert(matrix, insert_at, new.matrix[~found], axis=0)
+        days = np.insert(old.days[order], insert_at, new.days[~found])
+        keys = {col: np.insert(old.keys[col][order], insert_at, new.keys[col][~found]) for col in DIMENSIONS}
+        return CountCube(labels, keys, days, matrix, self.one_way, self.two_way)
+
+    def _cell_keys(self, first_day):
+        # Same ordering as the cells: day first, then the filter columns
+        return np.ravel_multi_index(
+            [self.days.astype(np.int64) - first_day] + [self.keys[col] for col in FILTER_COLUMNS],
+            [2**31] + [len(self.labels[col]) for col in FILTER_COLUMNS],
+        )
+
+    def save(self, path):
+        columns = {col: pa.array(codes) for col, codes in self.keys.items()}
+        columns["day"] = pa.array(self.days)
+        columns["counts"] = pa.FixedSizeListArray.from_arrays(pa.array(self.matrix.ravel()), self.width)
+        metadata = {
+            "labels": {col: labels.tolist() for col, labels in self.labels.items()},
+            "one_way": self.one_way,
+            "two_way": self.two_way,
+        }
+        table = pa.table(columns).replace_schema_metadata({"cube": json.dumps(metadata)})
+        # One chunk per column, so load() can map it without copying
+        feather.write_feather(table, path, compression="uncompressed", chunksize=max(len(table), 1))
+
+    @classmethod
+    def load(cls, path):
+        table = feather.read_table(path, memory_map=True)
+        metadata = json.loads(table.schema.metadata[b"cube"])
+        labels = {col: pd.Index(values) for col, values in metadata["labels"].items()}
+        keys = {col: table.column(col).to_numpy() for col in DIMENSIONS}
+        counts = table.column("counts")
+        counts = counts.chunk(0) if counts.num_chunks == 1 else counts.combine_chunks()
+        matrix = counts.flatten().to_numpy().reshape(len(table), counts.type.list_size)
+        return cls(labels, keys, table.column("day").to_numpy(), matrix,
+                   metadata["one_way"], metadata["two_way"])
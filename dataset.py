@@ -0,0 +1,386 @@
+import hashlib
+import itertools
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+import timeline
+from cube import CountCube
+
+# Survey Columns Stored as Categoricals (all of them are low-cardinality answers)
+CATEGORICAL_COLUMNS = [
+    "Gender", "Country", "Occupation", "self_employed", "family_history", "treatment",
+    "Days_Indoors", "Growing_Stress", "Changes_Habits", "Mental_Health_History",
+    "Mood_Swings", "Coping_Struggles", "Work_Interest", "Social_Weakness",
+    "mental_health_interview", "care_options",
+]
+
+# Bump when the cached layout changes so old cache files are rebuilt
+SCHEMA_VERSION = 8
+
+CACHE_FILE = "mental_health_dataset.arrow"
+META_FILE = "mental_health_dataset.json"
+CUBE_FILE = "mental_health_cube.arrow"
+PARQUET_DIR = "mental_health_dataset.parquet"
+PARQUET_META_FILE = "mental_health_dataset.parquet.json"
+
+# Rows parsed per step when streaming the CSV into Parquet
+CSV_CHUNK_ROWS = 1_000_000
+
+# The Parquet dataset is split into one directory per response month (PARTITION_COLUMN
+# is year * 100 + month), so a date range only opens the months it covers. Small row
+# groups, each sorted by Timestamp, let the scan skip more within a month.
+PARTITION_COLUMN = "Period"
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+
+# Published Dataset Versions kept in a shared directory (see publish()), so a worker
+# that has just read the pointer can still open the version it names
+KEEP_PUBLISHED = 2
+POINTER_FILE = "current.json"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def add_time_columns(df):
+    # Parse the timestamp once and derive every time column from it
+    df["Timestamp"] = timeline.parse(df["Timestamp"])
+    for col, values in timeline.time_columns(df["Timestamp"]).items():
+        df[col] = values
+    return df
+
+
+def _with_category(series, value):
+    return series if value in series.cat.categories else series.cat.add_categories(value)
+
+
+def _merge_category(series, old, new):
+    """series with the answer old spelled as new, whether or not new already occurs."""
+    if old not in series.cat.categories:
+        return series
+    if new not in series.cat.categories:
+        return series.cat.rename_categories({old: new})
+    return series.where(series != old, new).cat.remove_categories(old)
+
+
+def clean(df):
+    # Data Cleaning
+    df["self_employed"] = _with_category(df["self_employed"], "Not specified").fillna("Not specified")
+    df["care_options"] = _merge_category(df["care_options"], "Not sure", "Maybe")
+    return df
+
+
+def sort_categories(df):
+    # Sorted categories give the same ordering as grouping the plain strings, and
+    # read_csv only sorts them within each chunk it parses
+    for col in df.select_dtypes("category"):
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+
+def prepare(df):
+    return sort_categories(clean(add_time_columns(df)))
+
+
+def read_csv(csv_path):
+    df = prepare(pd.read_csv(csv_path, dtype={col: "category" for col in CATEGORICAL_COLUMNS}))
+    # Keep rows in time order so a date range is a contiguous block (see filters.FilterIndex)
+    return df.sort_values("Timestamp", kind="stable", ignore_index=True)
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _check_cache(csv_path, cache_path, meta_path):
+    """The CSV's stat and content hash, with the hash None when the cache is still current."""
+    stat = os.stat(csv_path)
+    meta = _read_meta(meta_path)
+    if meta.get("schema") == SCHEMA_VERSION and os.path.exists(cache_path):
+        if meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+            return stat, None
+        # mtime moved (e.g. a fresh checkout), only convert again if the content changed
+        sha256 = file_hash(csv_path)
+        if meta["sha256"] == sha256:
+            _write_meta(meta_path, {**meta, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+            return stat, None
+        return stat, sha256
+    return stat, file_hash(csv_path)
+
+
+def ingest(csv_path, cache_dir):
+    """Convert the CSV into the columnar cache, skipping the work when the CSV is unchanged."""
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, CACHE_FILE)
+    meta_path = os.path.join(cache_dir, META_FILE)
+    stat, sha256 = _check_cache(csv_path, cache_path, meta_path)
+    if sha256 is None:
+        return cache_path
+
+    df = read_csv(csv_path)
+    write_frame(df, cache_path)
+    # The count cube is rebuilt together with the dataset so the two always match
+    write_cube(CountCube.from_frame(df), os.path.join(cache_dir, CUBE_FILE))
+    _write_meta(meta_path, {
+        "schema": SCHEMA_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+    })
+    return cache_path
+
+
+def ingest_parquet(csv_path, cache_dir):
+    """Stream the CSV into a Parquet dataset one chunk at a time, so it never has to fit in memory.
+
+    Rows are partitioned by response month (see PARTITION_COLUMN) and sorted by
+    Timestamp within each chunk. The meta file also records every column's answers
+    and the time range, which is all the sidebar needs without reading rows.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    parquet_path = os.path.join(cache_dir, PARQUET_DIR)
+    meta_path = os.path.join(cache_dir, PARQUET_META_FILE)
+    stat, sha256 = _check_cache(csv_path, parquet_path, meta_path)
+    if sha256 is None:
+        return parquet_path
+
+    labels = {col: set() for col in CATEGORICAL_COLUMNS}
+    first, last, rows = None, None, 0
+    schema = None
+
+    def batches(chunks):
+        nonlocal first, last, rows, schema
+        for chunk in chunks:
+            chunk = prepare(chunk).sort_values("Timestamp", kind="stable", ignore_index=True)
+            for col, values in labels.items():
+                values.update(chunk[col].cat.categories)
+            timestamps = chunk["Timestamp"].dropna()
+            if len(timestamps):
+                first = min(first, timestamps.min()) if first is not None else timestamps.min()
+                last = max(last, timestamps.max()) if last is not None else timestamps.max()
+            rows += len(chunk)
+            # Missing timestamps get no month and land in the null partition
+            chunk[PARTITION_COLUMN] = (chunk["Year"].astype(np.int32) * 100 + chunk["Month"]).where(
+                chunk["Timestamp"].notna()).astype("Int32")
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if schema is None:
+                # Plain strings, as each chunk has its own categories; Parquet dictionary-encodes them anyway
+                schema = pa.schema([
+                    field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                    for field in table.schema
+                ])
+            yield from table.cast(schema).to_batches()
+
+    chunks = pd.read_csv(csv_path, dtype={col: "category" for col in CATEGORICAL_COLUMNS}, chunksize=CSV_CHUNK_ROWS)
+    batch_iter = batches(chunks)
+    # Pulling the first batch sets the schema the writer needs up front
+    first_batch = next(batch_iter, None)
+    if first_batch is None:
+        raise ValueError(f"{csv_path} has no rows")
+
+    tmp_path = parquet_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    ds.write_dataset(
+        itertools.chain([first_batch], batch_iter),
+        tmp_path,
+        schema=schema,
+        format="parquet",
+        partitioning=parquet_partitioning(),
+        min_rows_per_group=PARQUET_ROW_GROUP_ROWS,
+        max_rows_per_group=PARQUET_ROW_GROUP_ROWS,
+    )
+    _replace_path(tmp_path, parquet_path)
+
+    _write_meta(meta_path, {
+        "schema": SCHEMA_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+        "rows": rows,
+        "labels": {col: sorted(values) for col, values in labels.items()},
+        "start_date": first.date().isoformat(),
+        "end_date": last.date().isoformat(),
+    })
+    return parquet_path
+
+
+def _replace_path(tmp_path, path):
+    """Move the directory tmp_path to path, removing whatever was there (a directory or, from older caches, a file)."""
+    if os.path.isdir(path):
+        old_path = path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+
+
+def parquet_partitioning():
+    """How ingest_parquet() splits the dataset into directories, for reading it back."""
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int32())]), flavor="hive")
+
+
+def parquet_period(date):
+    """The PARTITION_COLUMN value of the month date falls in."""
+    return date.year * 100 + date.month
+
+
+def parquet_metadata(cache_dir):
+    """Answers, time range and CSV details recorded by ingest_parquet()."""
+    return _read_meta(os.path.join(cache_dir, PARQUET_META_FILE))
+
+
+def write_frame(df, path):
+    """Write a prepared frame as Arrow IPC that read_frame() maps back without copying.
+
+    Categoricals are stored as their integer codes (-1 for missing) with the
+    categories in the schema metadata, timestamps as int64 nanoseconds (NaT
+    included), and every column as a single uncompressed chunk.
+    """
+    columns, categories, datetimes = {}, {}, []
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories[col] = values.cat.categories.tolist()
+            values = values.cat.codes
+        elif pd.api.types.is_datetime64_dtype(values.dtype):
+            datetimes.append(col)
+            values = values.to_numpy("datetime64[ns]").view(np.int64)
+        columns[col] = pa.array(np.asarray(values))
+    table = pa.table(columns).replace_schema_metadata({
+        "frame": json.dumps({"categories": categories, "datetimes": datetimes}),
+    })
+    tmp_path = path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed", chunksize=max(len(df), 1))
+    os.replace(tmp_path, path)
+
+
+def read_frame(path):
+    """The frame written by write_frame(), backed by the memory-mapped file itself.
+
+    The arrays are read-only and pages are shared with every other process
+    mapping the same file, so nothing is parsed or copied.
+    """
+    table = feather.read_table(path, memory_map=True)
+    meta = json.loads(table.schema.metadata[b"frame"])
+    columns = {}
+    for col, column in zip(table.column_names, table.columns):
+        values = column.chunk(0).to_numpy() if column.num_chunks == 1 else column.to_numpy()
+        if col in meta["categories"]:
+            values = pd.Categorical.from_codes(values, meta["categories"][col], validate=False)
+        elif col in meta["datetimes"]:
+            values = values.view("datetime64[ns]")
+        columns[col] = pd.Series(values, name=col, copy=False)
+    return pd.DataFrame(columns, copy=False)
+
+
+def write_cube(cube, path):
+    tmp_path = path + ".tmp"
+    cube.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load(csv_path, cache_dir):
+    return read_frame(ingest(csv_path, cache_dir))
+
+
+def load_cube(csv_path, cache_dir):
+    ingest(csv_path, cache_dir)
+    return CountCube.load(os.path.join(cache_dir, CUBE_FILE))
+
+
+def metadata(cache_dir):
+    """Size, mtime and content hash of the CSV the cache was last built from."""
+    return _read_meta(os.path.join(cache_dir, META_FILE))
+
+
+def version(cache_dir):
+    return metadata(cache_dir).get("sha256")
+
+
+def append_rows(df, new):
+    """A new frame with the rows of new added, kept in time order. df itself is left untouched."""
+    columns = {}
+    for col in df.columns:
+        old_col, new_col = df[col], new[col]
+        if isinstance(old_col.dtype, pd.CategoricalDtype):
+            categories = old_col.cat.categories.union(new_col.cat.categories)
+            if len(categories) != len(old_col.cat.categories):
+                old_col = old_col.cat.set_categories(categories)
+            new_col = new_col.cat.set_categories(categories)
+        columns[col] = pd.concat([old_col, new_col], ignore_index=True)
+    combined = pd.DataFrame(columns)
+
+    timestamps = combined["Timestamp"]
+    if timestamps.isna().iloc[:len(df)].any() or timestamps.iloc[len(df):].min() < timestamps.iloc[:len(df)].max():
+        combined = combined.sort_values("Timestamp", kind="stable", ignore_index=True)
+    return combined
+
+
+def publish(df, cube, version, shared_dir):
+    """Make a dataset version available to every process attaching to shared_dir.
+
+    Each version gets its own subdirectory, named after it, and the pointer file
+    is switched to it last, so attach() never sees a half-written version. Only
+    the newest KEEP_PUBLISHED versions are kept; processes still mapping an
+    older one keep their pages until they let go of them.
+    """
+    os.makedirs(shared_dir, exist_ok=True)
+    version_dir = os.path.join(shared_dir, version)
+    if not os.path.exists(os.path.join(version_dir, META_FILE)):
+        os.makedirs(version_dir, exist_ok=True)
+        write_frame(df, os.path.join(version_dir, CACHE_FILE))
+        write_cube(cube, os.path.join(version_dir, CUBE_FILE))
+        _write_meta(os.path.join(version_dir, META_FILE), {"schema": SCHEMA_VERSION, "sha256": version})
+    _write_meta(os.path.join(shared_dir, POINTER_FILE), {"version": version})
+
+    published = [
+        entry for entry in os.scandir(shared_dir)
+        if entry.is_dir() and entry.name != version and os.path.exists(os.path.join(entry.path, META_FILE))
+    ]
+    published.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in published[KEEP_PUBLISHED - 1:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return version_dir
+
+
+def published_version(shared_dir):
+    """The version publish() last made current in shared_dir, or None before the first one."""
+    return _read_meta(os.path.join(shared_dir, POINTER_FILE)).get("version")
+
+
+def attach(shared_dir, version=None):
+    """The frame and count cube of a published version (default: the current one), mapped read-only."""
+    version = version or published_version(shared_dir)
+    version_dir = os.path.join(shared_dir, version or "")
+    if version is None or _read_meta(os.path.join(version_dir, META_FILE)).get("schema") != SCHEMA_VERSION:
+        raise FileNotFoundError(f"No dataset published in {shared_dir} (run publish.py)")
+    df = read_frame(os.path.join(version_dir, CACHE_FILE))
+    cube = CountCube.load(os.path.join(version_dir, CUBE_FILE))
+    return df, cube, version
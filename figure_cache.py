@@ -0,0 +1,94 @@
+import collections
+import hashlib
+import json
+import threading
+
+import plotly.io
+
+
+def state_key(chart_id, selections, start_date, end_date, version):
+    """Canonical hash of a chart and the filter state it was built for.
+
+    selections should already be canonical (see FilterIndex.canonical), so the
+    default view hashes the same whether the multiselects are empty or full.
+    """
+    payload = {
+        "chart": chart_id,
+        "version": version,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "selections": {col: sorted(map(str, values)) for col, values in selections.items()},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class FigureCache:
+    """Process-wide LRU of built Plotly figures, bounded by the size of their JSON.
+
+    Figures are shared between sessions, so callers must not modify what they get
+    back. A max_bytes of 0 disables caching.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, version):
+        """Drop every entry when the dataset version differs from the cached one."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self._bytes = 0
+                self.version = version
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, figure):
+        size = len(plotly.io.to_json(figure, validate=False))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (figure, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def get_or_build(self, key, build):
+        figure = self.get(key)
+        if figure is None:
+            figure = build()
+            self.put(key, figure)
+        return figure
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
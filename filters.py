@@ -0,0 +1,117 @@
+import datetime
+
+import numpy as np
+
+import timeline
+
+# Sidebar Filter Columns
+FILTER_COLUMNS = ["Gender", "Country", "Occupation"]
+
+# Up to this many values, a column mask is built from one comparison per value
+# rather than a lookup table indexed by every row's code
+EQUALITY_CODES = 6
+
+
+def canonical(options, selections):
+    """Selections with "every value" always spelled as an empty list and values in options order.
+
+    options maps each filter column to its values.
+    """
+    result = {}
+    for col, selected in selections.items():
+        chosen = [value for value in options[col] if value in set(selected)]
+        result[col] = [] if len(chosen) == len(options[col]) else chosen
+    return result
+
+
+class FilterIndex:
+    """Value codes per filter column and a sorted timestamp array, built once per dataset.
+
+    Rows must be sorted by Timestamp (missing timestamps last), which dataset.load()
+    guarantees, so a date range is always a contiguous block of rows. The codes
+    and timestamps are views of the frame's own arrays, so the index adds no
+    per-row memory (which matters when the frame lives in shared memory).
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.size = len(df)
+        self.codes, self.categories, self.options = {}, {}, {}
+        for col in columns:
+            codes = df[col].cat.codes.to_numpy()
+            categories = df[col].cat.categories
+            present = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+            self.codes[col] = codes
+            self.categories[col] = categories
+            # Only values that occur are offered in the sidebar
+            self.options[col] = list(categories[present])
+
+        timestamps = df["Timestamp"].to_numpy()
+        missing = np.isnat(timestamps)
+        valid = self.size - int(missing.sum())
+        self.timestamps = timestamps[:valid].view("int64")
+        if missing[:valid].any() or (np.diff(self.timestamps) < 0).any():
+            raise ValueError("FilterIndex needs rows sorted by Timestamp")
+
+    def values(self, col):
+        return list(self.options[col])
+
+    def canonical(self, selections):
+        return canonical(self.options, selections)
+
+    @property
+    def min_date(self):
+        return timeline.to_date(self.timestamps[0])
+
+    @property
+    def max_date(self):
+        return timeline.to_date(self.timestamps[-1])
+
+    def date_range(self, start_date, end_date):
+        end = end_date + datetime.timedelta(days=1)
+        return timeline.search_range(self.timestamps, timeline.day_start(start_date), timeline.day_start(end))
+
+    def _column_mask(self, col, selected, lo, hi):
+        options = self.options[col]
+        chosen = set(selected) & set(options)
+        if not len(selected) or len(chosen) == len(options):
+            return None
+
+        codes = self.codes[col][lo:hi]
+        if not chosen:
+            return np.zeros(len(codes), dtype=bool)
+        allowed = self.categories[col].isin(list(chosen))
+        wanted = np.flatnonzero(allowed)
+        unwanted = np.flatnonzero(~allowed & self.categories[col].isin(options))
+        # Comparing against a few codes is much cheaper than a table lookup per row
+        if len(wanted) <= EQUALITY_CODES and len(wanted) <= len(unwanted):
+            mask = codes == wanted[0]
+            for code in wanted[1:]:
+                mask |= codes == code
+            return mask
+        if len(unwanted) <= EQUALITY_CODES:
+            mask = codes >= 0
+            for code in unwanted:
+                mask &= codes != code
+            return mask
+        return np.append(allowed, False)[codes]
+
+    def select(self, selections, start_date, end_date):
+        """Rows matching the filters, as a slice or position array usable with df.iloc.
+
+        selections maps a filter column to its selected values; an empty selection
+        means every value. The date range is inclusive on both ends.
+        """
+        lo, hi = self.date_range(start_date, end_date)
+        mask = None
+        for col, selected in selections.items():
+            col_mask = self._column_mask(col, selected, lo, hi)
+            if col_mask is None:
+                continue
+            if mask is None:
+                mask = col_mask
+            else:
+                mask &= col_mask
+
+        if mask is None:
+            return slice(lo, hi)
+        return np.flatnonzero(mask) + lo
@@ -0,0 +1,194 @@
+"""Pre-render the dashboard's figures for the default view and popular filter presets.
+
+Every chart of every section is built for the unfiltered view and for each
+preset in the presets file, and written as Plotly JSON. The app serves these
+figures as they are when the sidebar matches an exported view for the same
+dataset version, without aggregating or building anything, and computes every
+other view live. With --html each view is also written as a static HTML page.
+
+    python prerender.py --html
+
+The presets file is a JSON list of views, each with a name and any of the
+sidebar filters (omitted ones cover everything):
+
+    [{"name": "Students in the United States", "Country": ["United States"],
+      "Occupation": ["Student"], "start_date": "2014-08-27", "end_date": "2016-02-01"}]
+
+Run it again after the dataset changes; views of an older version are never served.
+"""
+import argparse
+import collections
+import datetime
+import json
+import logging
+import os
+import threading
+
+import plotly.graph_objects as go
+import plotly.io
+
+import backends
+import charts
+import config
+from figure_cache import state_key
+from filters import FILTER_COLUMNS
+from store import open_store
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# One exported view: the overview metrics and each chart's figure (chart id -> figure)
+View = collections.namedtuple("View", ["name", "metrics", "figures"])
+
+
+def view_key(selections, start_date, end_date, version):
+    return state_key("prerendered", selections, start_date, end_date, version)
+
+
+def read_presets(path):
+    """(name, selections, start_date, end_date) for every preset, dates None where not given."""
+    try:
+        with open(path) as f:
+            presets = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [
+        (
+            preset["name"],
+            {col: preset.get(col, []) for col in FILTER_COLUMNS},
+            datetime.date.fromisoformat(preset["start_date"]) if "start_date" in preset else None,
+            datetime.date.fromisoformat(preset["end_date"]) if "end_date" in preset else None,
+        )
+        for preset in presets
+    ]
+
+
+def _html(name, metrics, figures):
+    parts = [f"<h1>Mental Health Dashboard: {name}</h1>"]
+    parts += [f"<p><b>{label}</b>: {value}</p>" for label, value in metrics.items()]
+    for i, figure in enumerate(figures.values()):
+        parts.append(plotly.io.to_html(figure, full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+    return f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{name}</title></head><body>\n" \
+           + "\n".join(parts) + "\n</body></html>\n"
+
+
+def export(data, out_dir, presets=(), html=False):
+    """Write the default view and the presets of data (a backends query interface) into out_dir.
+
+    Returns the manifest: the dataset version and the exported views by key.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE)) as f:
+            previous = json.load(f)["views"]
+    except FileNotFoundError:
+        previous = {}
+    views = {}
+    for name, selections, start_date, end_date in [("Default", {}, None, None), *presets]:
+        selections = data.canonical({col: selections.get(col, []) for col in FILTER_COLUMNS})
+        start_date = start_date or data.min_date
+        end_date = end_date or data.max_date
+        agg = data.aggregates(selections, start_date, end_date)
+        metrics = charts.overview_metrics(agg)
+        figures = {chart.id: chart.build(agg, data.overall) for chart in charts.CHARTS.values()}
+
+        key = view_key(selections, start_date, end_date, data.version)
+        view = {
+            "name": name,
+            "selections": selections,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "metrics": metrics,
+            "figures": {chart_id: json.loads(plotly.io.to_json(figure, validate=False))
+                        for chart_id, figure in figures.items()},
+        }
+        _write_json(os.path.join(out_dir, f"{key}.json"), view)
+        if html:
+            with open(os.path.join(out_dir, f"{key}.html"), "w") as f:
+                f.write(_html(name, metrics, figures))
+        views[key] = {"name": name, "file": f"{key}.json"}
+        logger.info("Exported %s", name)
+
+    manifest = {"version": data.version, "views": views}
+    _write_json(os.path.join(out_dir, MANIFEST_FILE), manifest)
+    # Views only the previous export wrote are removed once the new manifest is in place;
+    # anything else in out_dir isn't ours to delete
+    for key in previous.keys() - views.keys():
+        for name in (f"{key}.json", f"{key}.html"):
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except FileNotFoundError:
+                pass
+    return manifest
+
+
+def _write_json(path, value):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+class PrerenderedViews:
+    """The views export() wrote to a directory, looked up by filter state.
+
+    The manifest is read again whenever it changes, and each view's figures are
+    parsed once, when it's first served.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._manifest_mtime = None
+        self._manifest = {}
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def _refresh_manifest(self):
+        try:
+            mtime = os.stat(os.path.join(self.path, MANIFEST_FILE)).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            self._manifest = {}
+            self._views = {}
+            if mtime is not None:
+                with open(os.path.join(self.path, MANIFEST_FILE)) as f:
+                    self._manifest = json.load(f)
+
+    def get(self, selections, start_date, end_date, version):
+        """The View exported for this filter state (canonical selections) and dataset version, or None."""
+        key = view_key(selections, start_date, end_date, version)
+        with self._lock:
+            self._refresh_manifest()
+            if self._manifest.get("version") != version or key not in self._manifest["views"]:
+                return None
+            if key not in self._views:
+                with open(os.path.join(self.path, self._manifest["views"][key]["file"])) as f:
+                    view = json.load(f)
+                # Validated when they were built, and validating every property again takes far longer than reading them
+                figures = {chart_id: go.Figure(figure, _validate=False) for chart_id, figure in view["figures"].items()}
+                self._views[key] = View(view["name"], view["metrics"], figures)
+            return self._views[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=config.PRERENDER_DIR,
+                        help="directory to write the views to (default: MHD_PRERENDER_DIR)")
+    parser.add_argument("--presets", default=config.PRESETS_FILE,
+                        help="JSON file listing the filter presets (default: MHD_PRESETS_FILE)")
+    parser.add_argument("--html", action="store_true", help="also write every view as a static HTML page")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    store = open_store(config.BACKEND, config.DATASET_PATH, config.CACHE_DIR, config.INCOMING_DIR, config.SHARED_DIR)
+    store.refresh()
+    data = backends.queries(store.snapshot, config.BACKEND)
+    manifest = export(data, args.output, read_presets(args.presets), args.html)
+    logger.info("Wrote %d views to %s", len(manifest["views"]), args.output)
+
+
+if __name__ == "__main__":
+    main()
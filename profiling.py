@@ -0,0 +1,152 @@
+import collections
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# One timed stage of a rerun. chart is empty for stages that aren't about one chart.
+# seconds include nested stages; allocated is the peak traced allocation (None when not tracing).
+Stage = collections.namedtuple("Stage", ["name", "chart", "seconds", "allocated"])
+
+# The profile of the rerun running on each thread (streamlit runs every session's script in its own)
+_active = threading.local()
+
+
+def stage(name, chart=""):
+    """Time a stage of this thread's current rerun; a no-op outside a profiled rerun.
+
+    Lets lower layers (e.g. query backends) mark their own stages without
+    being handed the profile.
+    """
+    profile = getattr(_active, "profile", None)
+    return profile.stage(name, chart) if profile is not None else contextlib.nullcontext()
+
+
+class Metrics:
+    """Running totals per (stage, chart) for the whole process, exported as Prometheus text."""
+
+    def __init__(self):
+        self.reruns = 0
+        self._totals = collections.defaultdict(lambda: [0, 0.0, 0])
+        self._lock = threading.Lock()
+
+    def record(self, stage):
+        with self._lock:
+            totals = self._totals[(stage.name, stage.chart)]
+            totals[0] += 1
+            totals[1] += stage.seconds
+            totals[2] += stage.allocated or 0
+
+    def finish_rerun(self):
+        with self._lock:
+            self.reruns += 1
+
+    def prometheus(self, figure_cache_stats=None):
+        """Metrics in the Prometheus text exposition format."""
+        with self._lock:
+            totals = dict(self._totals)
+            reruns = self.reruns
+
+        lines = [
+            "# HELP mhd_reruns_total Dashboard script runs.",
+            "# TYPE mhd_reruns_total counter",
+            f"mhd_reruns_total {reruns}",
+        ]
+        for metric, index, help_text in [
+            ("mhd_stage_calls_total", 0, "Times a stage ran."),
+            ("mhd_stage_seconds_total", 1, "Wall time spent in a stage, including nested stages."),
+            ("mhd_stage_allocated_bytes_total", 2, "Peak traced allocations of a stage, summed over calls."),
+        ]:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (stage, chart), values in sorted(totals.items()):
+                labels = f'stage="{stage}"' + (f',chart="{chart}"' if chart else "")
+                lines.append(f"{metric}{{{labels}}} {values[index]:.6g}")
+
+        for key, value in sorted((figure_cache_stats or {}).items()):
+            kind = "counter" if key in ("hits", "misses", "evictions") else "gauge"
+            metric = f"mhd_figure_cache_{key}" + ("_total" if kind == "counter" else "")
+            lines += [f"# TYPE {metric} {kind}", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, figure_cache_stats=None):
+        """Write the metrics for a textfile collector, replacing the file atomically."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus(figure_cache_stats))
+        os.replace(tmp_path, path)
+
+
+class RerunProfile:
+    """Timers (and optionally tracemalloc counters) for the stages of one script run.
+
+    Stages may nest, e.g. the selection is aggregated inside the first chart
+    build that needs it. Every finished stage is also added to metrics.
+    """
+
+    def __init__(self, metrics, trace_allocations=False):
+        self.metrics = metrics
+        self.trace_allocations = trace_allocations
+        self.stages = []
+        self.started = time.perf_counter()
+        self.seconds = None
+        self._open = threading.local()
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _active.profile = self
+
+    @contextlib.contextmanager
+    def stage(self, name, chart=""):
+        stack = self._open.__dict__.setdefault("stack", [])
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame = {"start": current, "peak": current}
+        else:
+            frame = {}
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            allocated = None
+            if self.trace_allocations:
+                frame["peak"] = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                allocated = frame["peak"] - frame["start"]
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], frame["peak"])
+            stage = Stage(name, chart, seconds, allocated)
+            self.stages.append(stage)
+            self.metrics.record(stage)
+
+    def finish(self):
+        """Close the rerun: count it and emit it as one structured DEBUG log record."""
+        self.seconds = time.perf_counter() - self.started
+        self.metrics.finish_rerun()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({
+                "event": "rerun",
+                "seconds": round(self.seconds, 6),
+                "stages": [stage._asdict() for stage in self.stages],
+            }))
+
+    def table(self):
+        """Stages as rows for display, slowest first."""
+        rows = [
+            {
+                "Stage": stage.name,
+                "Chart": stage.chart,
+                "ms": round(stage.seconds * 1e3, 1),
+                "KiB": None if stage.allocated is None else round(stage.allocated / 1024, 1),
+            }
+            for stage in self.stages
+        ]
+        return sorted(rows, key=lambda row: row["ms"], reverse=True)
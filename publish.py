@@ -0,0 +1,53 @@
+"""Publish the dataset into a shared directory for every dashboard worker on the host.
+
+Parses the CSV (through the usual columnar cache), then writes the frame and
+count cube as uncompressed Arrow files into the shared directory. Workers
+started with the same MHD_SHARED_DIR memory-map those files read-only, so the
+host holds one copy of the dataset however many workers run, and workers start
+without parsing anything. With --watch the publisher keeps picking up new
+survey rows (see store.DatasetStore) and publishes each new version.
+
+    MHD_SHARED_DIR=/dev/shm/mhd python publish.py --watch 60
+"""
+import argparse
+import logging
+import time
+
+import config
+import dataset
+from store import DatasetStore
+
+logger = logging.getLogger(__name__)
+
+
+def publish(store, shared_dir):
+    snapshot = store.snapshot
+    path = dataset.publish(snapshot.df, snapshot.cube, snapshot.version, shared_dir)
+    logger.info("Published %d rows to %s", len(snapshot.df), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shared-dir", default=config.SHARED_DIR or "/dev/shm/mhd",
+                        help="directory the workers attach to (default: MHD_SHARED_DIR or /dev/shm/mhd)")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep running and publish new rows found every SECONDS")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    store = DatasetStore(config.DATASET_PATH, config.CACHE_DIR, config.INCOMING_DIR)
+    store.refresh()
+    publish(store, args.shared_dir)
+    while args.watch:
+        time.sleep(args.watch)
+        try:
+            changed = store.refresh()
+        except Exception:
+            logger.exception("Refreshing the dataset failed")
+            continue
+        if changed:
+            publish(store, args.shared_dir)
+
+
+if __name__ == "__main__":
+    main()
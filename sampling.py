@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from aggregations import Aggregates
+from filters import FILTER_COLUMNS, FilterIndex
+
+# Rows expected from every stratum however small, so rare groups still show up in approximate charts
+MIN_PER_STRATUM = 20
+
+
+def stratum_keys(codes, labels, strata=FILTER_COLUMNS):
+    """One integer per row for its combination of strata values (missing values count as a value)."""
+    return np.ravel_multi_index(
+        [codes[col].astype(np.int64) + 1 for col in strata],
+        [len(labels[col]) + 1 for col in strata],
+    )
+
+
+def inclusion_probabilities(stratum_sizes, size, min_per_stratum=MIN_PER_STRATUM):
+    """Chance of keeping a row, per stratum, for a sample of about size rows.
+
+    Every stratum is sampled at the same rate, except that small strata are
+    sampled more heavily so about min_per_stratum of their rows are kept.
+    """
+    rate = size / max(int(stratum_sizes.sum()), 1)
+    with np.errstate(divide="ignore"):
+        probabilities = np.maximum(rate, min_per_stratum / stratum_sizes)
+    return np.minimum(probabilities, 1.0)
+
+
+class Sample:
+    """A stratified sample of the rows, answering aggregates() approximately.
+
+    Strata are the sidebar filter combinations (Gender, Country, Occupation).
+    Each kept row is weighted by the inverse of its chance of being kept, so
+    weighted counts estimate the counts over every row. Rows must be sorted
+    by Timestamp as for filters.FilterIndex.
+    """
+
+    def __init__(self, df, weights, rows):
+        self.df = df
+        self.weights = weights
+        self.rows = rows
+        self.filter_index = FilterIndex(df)
+
+    @classmethod
+    def from_frame(cls, df, size, seed=0):
+        codes = {col: df[col].cat.codes.to_numpy() for col in FILTER_COLUMNS}
+        labels = {col: df[col].cat.categories for col in FILTER_COLUMNS}
+        keys = stratum_keys(codes, labels)
+        probabilities = inclusion_probabilities(np.bincount(keys), size)[keys]
+        keep = np.random.default_rng(seed).random(len(df)) < probabilities
+        return cls(df[keep].reset_index(drop=True), 1 / probabilities[keep], len(df))
+
+    @classmethod
+    def from_columns(cls, columns, probabilities, rows):
+        """A sample from kept rows given as column arrays (in any order) and their chance of being kept."""
+        df = pd.DataFrame(columns)
+        order = np.argsort(df["Timestamp"].to_numpy(), kind="stable")
+        return cls(df.take(order).reset_index(drop=True), 1 / probabilities[order], rows)
+
+    def aggregates(self, selections=None, start_date=None, end_date=None):
+        """Estimated Aggregates for a filter state (same arguments as filters.FilterIndex.select)."""
+        if start_date is None:
+            start_date = self.filter_index.min_date
+        if end_date is None:
+            end_date = self.filter_index.max_date
+        positions = self.filter_index.select(selections or {}, start_date, end_date)
+        return Aggregates.from_frame(self.df.iloc[positions], weights=self.weights[positions])
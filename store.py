@@ -0,0 +1,230 @@
+import collections
+import glob
+import hashlib
+import io
+import logging
+import os
+import threading
+
+import pandas as pd
+
+import countries
+import dataset
+from backends import ParquetQueries, check_backend
+from filters import FilterIndex
+
+logger = logging.getLogger(__name__)
+
+# How many bytes before the consumed end of the CSV are checked to tell an append from a rewrite
+TAIL_CHECK_BYTES = 64 * 1024
+
+# Everything one rerun reads, swapped as a whole so a rerun never mixes two dataset versions
+Snapshot = collections.namedtuple("Snapshot", ["df", "filter_index", "cube", "overall", "version"])
+
+
+def watch(refresh, interval):
+    """Call refresh() every interval seconds on a daemon thread; returns an Event that stops it."""
+    def poll():
+        while not stop.wait(interval):
+            try:
+                refresh()
+            except Exception:
+                logger.exception("Refreshing the dataset failed")
+
+    stop = threading.Event()
+    threading.Thread(target=poll, name="dataset-refresh", daemon=True).start()
+    return stop
+
+
+def _tail_hash(path, offset):
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - TAIL_CHECK_BYTES))
+        return hashlib.sha256(f.read(offset - f.tell())).hexdigest()
+
+
+class DatasetStore:
+    """The loaded dataset plus its derived structures, kept current as survey rows arrive.
+
+    New rows come from two places: lines appended to the main CSV and batch CSV
+    files (same columns) dropped into incoming_dir. refresh() parses only those
+    rows and extends the frame, filter index and count cube; a CSV that was
+    rewritten rather than appended to triggers a full reload instead.
+    Batch files should be moved into the directory once complete.
+    """
+
+    def __init__(self, csv_path, cache_dir, incoming_dir=None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self.incoming_dir = incoming_dir
+        self._lock = threading.Lock()
+        self._seen_batches = set()
+        self._bad_batches = set()
+        self._reload()
+
+    def _reload(self):
+        df = dataset.load(self.csv_path, self.cache_dir)
+        cube = dataset.load_cube(self.csv_path, self.cache_dir)
+        meta = dataset.metadata(self.cache_dir)
+        self._csv_offset = meta["size"]
+        self._csv_tail = _tail_hash(self.csv_path, self._csv_offset)
+        self._seen_batches.clear()
+        countries.report_unmatched(cube.labels["Country"])
+        self.snapshot = Snapshot(df, FilterIndex(df), cube, cube.aggregates(), meta["sha256"])
+
+    def _read_csv_tail(self):
+        """Rows appended to the main CSV since the last read and the offset they end at, or (None, offset)."""
+        size = os.stat(self.csv_path).st_size
+        if size == self._csv_offset:
+            return None, self._csv_offset
+        if size < self._csv_offset or _tail_hash(self.csv_path, self._csv_offset) != self._csv_tail:
+            raise ValueError("CSV was rewritten")
+
+        with open(self.csv_path, "rb") as f:
+            header = f.readline()
+            f.seek(self._csv_offset)
+            data = f.read(size - self._csv_offset)
+        # Leave a half-written last line for the next refresh
+        data = data[:data.rfind(b"\n") + 1]
+        if not data.strip():
+            return None, self._csv_offset
+        return dataset.read_csv(io.BytesIO(header + data)), self._csv_offset + len(data)
+
+    def _read_batches(self):
+        """Rows of the batch files not read yet, and the paths they came from.
+
+        A file that can't be parsed is logged and skipped until it's modified, so
+        one bad batch doesn't hold back the rest.
+        """
+        if not self.incoming_dir:
+            return [], []
+        batches, paths = [], []
+        for path in sorted(glob.glob(os.path.join(self.incoming_dir, "*.csv"))):
+            if path in self._seen_batches:
+                continue
+            try:
+                stamp = (path, os.stat(path).st_mtime_ns)
+                if stamp in self._bad_batches:
+                    continue
+                batches.append(dataset.read_csv(path))
+            except FileNotFoundError:
+                continue
+            except Exception:
+                logger.exception("Skipping batch file %s, it couldn't be read", path)
+                self._bad_batches.add(stamp)
+                continue
+            paths.append(path)
+        return batches, paths
+
+    def refresh(self):
+        """Pick up new rows; returns True when the snapshot changed.
+
+        Everything new is parsed before anything is recorded as read, so rows
+        are only marked consumed once they're in the snapshot.
+        """
+        with self._lock:
+            try:
+                tail, offset = self._read_csv_tail()
+            except ValueError:
+                logger.info("%s was rewritten, reloading it in full", self.csv_path)
+                self._reload()
+                return True
+            batches, paths = self._read_batches()
+            if tail is not None:
+                batches.insert(0, tail)
+            batches = [batch for batch in batches if len(batch)]
+
+            if batches:
+                new = pd.concat(batches, ignore_index=True).sort_values("Timestamp", kind="stable", ignore_index=True)
+                # Concatenating batches with different categories falls back to object columns
+                for col, dtype in self.snapshot.df.dtypes.items():
+                    if isinstance(dtype, pd.CategoricalDtype):
+                        new[col] = new[col].astype("category")
+                self.snapshot = self._append(self.snapshot, new)
+                logger.info("Appended %d new survey rows", len(new))
+            if offset != self._csv_offset:
+                self._csv_offset = offset
+                self._csv_tail = _tail_hash(self.csv_path, offset)
+            self._seen_batches.update(paths)
+            return bool(batches)
+
+    def _append(self, old, new):
+        df = dataset.append_rows(old.df, new)
+        # The index only holds views of the merged frame, so building it is one cheap pass
+        filter_index = FilterIndex(df)
+        cube = old.cube.append(new)
+        if len(cube.labels["Country"]) != len(old.cube.labels["Country"]):
+            countries.report_unmatched(cube.labels["Country"])
+        digest = hashlib.sha256(old.version.encode())
+        digest.update(pd.util.hash_pandas_object(new, index=False).to_numpy().tobytes())
+        return Snapshot(df, filter_index, cube, cube.aggregates(), digest.hexdigest())
+
+    def watch(self, interval):
+        return watch(self.refresh, interval)
+
+
+class SharedStore:
+    """A dataset published into shared_dir by another process (see publish.py), attached read-only.
+
+    The frame and count cube are memory-mapped from the published files, so every
+    worker on the host shares one copy of them and nothing is parsed on start.
+    refresh() switches to a newer version once the publisher has made it current.
+    """
+
+    def __init__(self, shared_dir):
+        self.shared_dir = shared_dir
+        self._lock = threading.Lock()
+        self.snapshot = None
+        self.refresh()
+
+    def refresh(self):
+        """Attach to the current published version; returns True when the snapshot changed."""
+        with self._lock:
+            version = dataset.published_version(self.shared_dir)
+            if self.snapshot is not None and self.snapshot.version == version:
+                return False
+            df, cube, version = dataset.attach(self.shared_dir, version)
+            countries.report_unmatched(cube.labels["Country"])
+            self.snapshot = Snapshot(df, FilterIndex(df), cube, cube.aggregates(), version)
+            return True
+
+    def watch(self, interval):
+        return watch(self.refresh, interval)
+
+
+class ParquetStore:
+    """The dataset as a Parquet file on disk, queried without loading its rows.
+
+    snapshot is a backends.ParquetQueries. A changed CSV is converted again in
+    full on refresh(); batch files in an incoming directory aren't picked up.
+    """
+
+    def __init__(self, csv_path, cache_dir):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self.snapshot = None
+        self.refresh()
+
+    def refresh(self):
+        """Convert the CSV again if it changed; returns True when the snapshot changed."""
+        with self._lock:
+            path = dataset.ingest_parquet(self.csv_path, self.cache_dir)
+            meta = dataset.parquet_metadata(self.cache_dir)
+            if self.snapshot is not None and self.snapshot.version == meta["sha256"]:
+                return False
+            countries.report_unmatched(meta["labels"]["Country"])
+            self.snapshot = ParquetQueries(path, meta)
+            return True
+
+    def watch(self, interval):
+        return watch(self.refresh, interval)
+
+
+def open_store(backend, csv_path, cache_dir, incoming_dir=None, shared_dir=None):
+    """The store for a configured query backend (see backends.BACKENDS) and shared directory."""
+    check_backend(backend)
+    if backend == "parquet":
+        return ParquetStore(csv_path, cache_dir)
+    if shared_dir:
+        return SharedStore(shared_dir)
+    return DatasetStore(csv_path, cache_dir, incoming_dir)
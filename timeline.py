@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Survey Timestamp Format, e.g. "8/27/2014 11:29"
+TIMESTAMP_FORMAT = "%m/%d/%Y %H:%M"
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Calendar Buckets for time series (unit -> column name)
+BUCKETS = {"Y": "Year", "M": "Month", "D": "Date"}
+
+
+def parse(values):
+    """Survey timestamps parsed with the known format in one vectorized pass.
+
+    Values in another spelling are parsed individually, anything unparseable becomes NaT.
+    """
+    # Arrow's strptime is far faster than pandas' for a non-ISO format
+    parsed = pc.strptime(pa.array(values, type=pa.string(), from_pandas=True),
+                         format=TIMESTAMP_FORMAT, unit="s", error_is_null=True)
+    timestamps = pd.Series(parsed.to_numpy(zero_copy_only=False), index=values.index).astype("datetime64[ns]")
+    retry = timestamps.isna() & values.notna()
+    if retry.any():
+        timestamps[retry] = pd.to_datetime(values[retry], format="mixed", errors="coerce")
+    return timestamps
+
+
+def time_columns(timestamps):
+    """Hour, Month, Year and weekday columns derived from parsed timestamps, as compact dtypes.
+
+    The numeric columns are plain integers with -1 for a missing timestamp, so
+    they can be shared zero-copy (see dataset.read_frame).
+    """
+    dt = timestamps.dt
+    return {
+        "Hour": dt.hour.fillna(-1).astype(np.int8),
+        "Month": dt.month.fillna(-1).astype(np.int8),
+        "Year": dt.year.fillna(-1).astype(np.int16),
+        "Day": pd.Categorical.from_codes(dt.dayofweek.fillna(-1).astype(np.int8), DAY_NAMES),
+    }
+
+
+def day_numbers(timestamps):
+    """Days since the epoch for each timestamp, plus a mask of the ones that aren't missing."""
+    values = np.asarray(timestamps, dtype="datetime64[ns]")
+    return values.astype("datetime64[D]").astype(np.int64), ~np.isnat(values)
+
+
+def day_number(date):
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def day_start(date):
+    """Epoch nanoseconds at the start of date."""
+    return int(np.datetime64(date, "ns").astype(np.int64))
+
+
+def to_date(timestamp):
+    """Calendar date of epoch nanoseconds."""
+    return np.datetime64(int(timestamp), "ns").astype("datetime64[D]").item()
+
+
+def search_range(values, start=None, end=None):
+    """Positions [lo, hi) of the sorted values in [start, end); None leaves that side open."""
+    lo = 0 if start is None else int(np.searchsorted(values, start, "left"))
+    hi = len(values) if end is None else int(np.searchsorted(values, end, "left"))
+    return lo, hi
+
+
+def bucket(days, counts, unit="Y"):
+    """Per-day counts summed into calendar years, months or days, as a (bucket, Total_Responses) frame."""
+    keys = np.asarray(days).astype("datetime64[D]").astype(f"datetime64[{unit}]")
+    labels, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=counts, minlength=len(labels)).astype(np.int64)
+    if unit == "Y":
+        labels = labels.astype(np.int64) + 1970
+    else:
+        labels = labels.astype("datetime64[ns]")
+    return pd.DataFrame({BUCKETS[unit]: labels, "Total_Responses": totals})